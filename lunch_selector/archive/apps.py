@@ -0,0 +1,8 @@
+"""Configs for archive app"""
+from django.apps import AppConfig
+
+
+class ArchiveConfig(AppConfig):
+    """Archive app config class"""
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "archive"
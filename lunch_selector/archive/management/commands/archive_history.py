@@ -0,0 +1,96 @@
+"""Archive old menus and votes django management commands
+Usage:
+python manage.py archive_history
+python manage.py archive_history --horizon-days 180 --batch-size 5000
+
+Moves menus older than the horizon, and all votes of them, into the
+archive tables in batches of one transaction each. Days are closed into
+DailyResult first, so the consecutive winner rule keeps working.
+Rows are deleted without the model collector and its per row signals, the
+leaderboard is invalidated once at the end.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from archive.models import ArchivedMenu, ArchivedMenuVote
+from restaurant.models import Menu
+from vote import leaderboard
+from vote.daily_results import close_day, streak_length
+from vote.models import DailyResult, MenuVote
+
+MENU_FIELDS = ("id", "restaurant_id", "name", "details", "day", "vote_count")
+VOTE_FIELDS = ("id", "menu_id", "employee_id", "day")
+
+
+class Command(BaseCommand):
+    """archive_history command class"""
+    help = "Move menus and votes older than the horizon to archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--horizon-days", type=int)
+        parser.add_argument("--batch-size", type=int)
+
+    @staticmethod
+    def _close_days(cutoff):
+        """Store results of days to archive which were never closed"""
+        days = Menu.objects.filter(day__lt=cutoff).order_by("day").values_list(
+            "day", flat=True
+        ).distinct()
+        closed = set(DailyResult.objects.filter(day__lt=cutoff).values_list(
+            "day", flat=True
+        ).distinct())
+        for day in days:
+            if day not in closed:
+                close_day(day)
+
+    @staticmethod
+    def _delete(model, ids):
+        """Delete rows of model in one statement, without signals per row"""
+        if model is Menu:
+            # done by the collector otherwise, results keep the winner restaurant
+            DailyResult.objects.filter(menu_id__in=ids).update(menu=None)
+        rows = model.objects.filter(id__in=ids)
+        rows._raw_delete(rows.db)  # pylint: disable=protected-access
+
+    @classmethod
+    def _move(cls, queryset, fields, archive_model, batch_size):
+        """Copy batches of queryset rows to archive_model and delete them"""
+        moved = 0
+        while True:
+            with transaction.atomic():
+                rows = list(queryset.order_by("id").values_list(*fields)[:batch_size])
+                if not rows:
+                    return moved
+                archive_model.objects.bulk_create(
+                    [archive_model(**dict(zip(fields, row))) for row in rows],
+                    ignore_conflicts=True
+                )
+                cls._delete(queryset.model, [row[0] for row in rows])
+            moved += len(rows)
+
+    def handle(self, *args, **options):
+        """archive_history command logic here"""
+        horizon = options["horizon_days"] or settings.ARCHIVE["HORIZON_DAYS"]
+        batch_size = options["batch_size"] or settings.ARCHIVE["BATCH_SIZE"]
+        if horizon <= streak_length():
+            raise CommandError(
+                f"Horizon must be longer than the streak length of {streak_length()} days"
+            )
+
+        cutoff = datetime.date.today() - datetime.timedelta(days=horizon)
+        self._close_days(cutoff)
+        votes = self._move(
+            MenuVote.objects.filter(menu__day__lt=cutoff), VOTE_FIELDS,
+            ArchivedMenuVote, batch_size
+        )
+        menus = self._move(
+            Menu.objects.filter(day__lt=cutoff), MENU_FIELDS, ArchivedMenu, batch_size
+        )
+        if menus:
+            leaderboard.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {menus} menus and {votes} votes older than {cutoff}"
+        ))
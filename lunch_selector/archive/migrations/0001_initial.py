@@ -0,0 +1,34 @@
+# Generated by Django 3.2.5 on 2026-10-18 08:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMenu',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('restaurant_id', models.BigIntegerField(verbose_name='restaurant')),
+                ('name', models.CharField(max_length=100, verbose_name='name')),
+                ('details', models.TextField(max_length=5000, verbose_name='details')),
+                ('day', models.DateField(db_index=True, verbose_name='date')),
+                ('vote_count', models.IntegerField(verbose_name='votes')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedMenuVote',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('menu_id', models.BigIntegerField(verbose_name='menu')),
+                ('employee_id', models.BigIntegerField(verbose_name='name')),
+                ('day', models.DateField(db_index=True, verbose_name='date')),
+            ],
+        ),
+    ]
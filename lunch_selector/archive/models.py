@@ -0,0 +1,31 @@
+"""Cold storage of old menus and votes
+
+Rows keep their original ids. They have no foreign keys, so archived
+history never slows down or cascades from the hot tables.
+"""
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+
+
+class ArchivedMenu(models.Model):
+    """Menu older than the archive horizon"""
+    id = models.BigIntegerField(primary_key=True)
+    restaurant_id = models.BigIntegerField(verbose_name=_("restaurant"))
+    name = models.CharField(verbose_name=_("name"), max_length=100)
+    details = models.TextField(verbose_name=_("details"), max_length=5000)
+    day = models.DateField(verbose_name=_("date"), db_index=True)
+    vote_count = models.IntegerField(verbose_name=_("votes"))
+
+    def __str__(self):  # pylint: disable=invalid-str-returned
+        return self.name
+
+
+class ArchivedMenuVote(models.Model):
+    """Vote older than the archive horizon"""
+    id = models.BigIntegerField(primary_key=True)
+    menu_id = models.BigIntegerField(verbose_name=_("menu"))
+    employee_id = models.BigIntegerField(verbose_name=_("name"))
+    day = models.DateField(verbose_name=_("date"), db_index=True)
+
+    def __str__(self):
+        return f"{self.menu_id}-{self.day}"
@@ -0,0 +1,68 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from archive.models import ArchivedMenu, ArchivedMenuVote
+from restaurant.models import Restaurant, Menu
+from user.models import SelectorUser
+from vote import daily_results
+from vote.models import DailyResult, MenuVote
+
+
+class ArchiveHistoryTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        manager = SelectorUser.objects.create(
+            username="manager", user_type=SelectorUser.RESTAURANT_MANAGER
+        )
+        self.employee = SelectorUser.objects.create(
+            username="employee", user_type=SelectorUser.EMPLOYEE
+        )
+        self.restaurant = Restaurant.objects.create(name="restaurant", manager=manager)
+        self.today = datetime.date.today()
+        for days_ago in range(10):
+            day = self.today - datetime.timedelta(days=days_ago)
+            menu = Menu.objects.create(
+                restaurant=self.restaurant, name=f"menu {days_ago}",
+                details="details", day=day
+            )
+            MenuVote(menu=menu, employee=self.employee, day=day).save()
+
+    def test_archive(self):
+        out = StringIO()
+        with mock.patch("vote.leaderboard.reset") as reset, \
+                self.captureOnCommitCallbacks(execute=True):
+            call_command("archive_history", horizon_days=5, batch_size=2, stdout=out)
+        reset.assert_called_once_with()
+        self.assertIn("Archived 4 menus and 4 votes", out.getvalue())
+
+        cutoff = self.today - datetime.timedelta(days=5)
+        self.assertFalse(Menu.objects.filter(day__lt=cutoff).exists())
+        self.assertFalse(MenuVote.objects.filter(day__lt=cutoff).exists())
+        self.assertEqual(Menu.objects.count(), 6)
+        self.assertEqual(ArchivedMenuVote.objects.count(), 4)
+        archived = ArchivedMenu.objects.get(day=self.today - datetime.timedelta(days=9))
+        self.assertEqual(archived.vote_count, 1)
+        self.assertEqual(archived.restaurant_id, self.restaurant.id)
+
+        # archived days keep their winners, the only restaurant wins two days
+        # running and can not win the third day
+        self.assertEqual(
+            list(DailyResult.objects.filter(day__lt=cutoff).order_by("day").values_list(
+                "streak", "menu"
+            )),
+            [(1, None), (2, None), (1, None)]
+        )
+        self.assertEqual(
+            daily_results.excluded_restaurants(self.today), frozenset()
+        )
+
+    def test_horizon_shorter_than_streak(self):
+        with self.assertRaises(CommandError):
+            call_command("archive_history", horizon_days=2, stdout=StringIO())
@@ -0,0 +1,163 @@
+"""Read fast path of list and retrieve actions
+
+A serializer builds a model instance for every row and runs the
+to_representation of each of its fields. When all readable fields of a
+serializer are plain columns with a known representation, the rows are read
+with .values() instead and mapped to the same output by accessors computed
+once per serializer class. Other serializers keep the regular path.
+
+Both paths accept ?fields=name,... to return only some of the readable
+fields, the fast path then selects only their columns.
+"""
+from rest_framework import ISO_8601, fields, relations
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Fields whose representation of a database value is the value itself
+IDENTITY_FIELDS = (fields.IntegerField, fields.CharField)
+
+
+def _identity(value):
+    """Value as stored"""
+    return value
+
+
+def _iso_date(value):
+    """Date as DRF's DateField renders it by default"""
+    return None if value is None else value.isoformat()
+
+
+def field_converter(field):
+    """Function mapping a column value to the field's representation
+
+    None when the field is not a plain column or its representation differs.
+    """
+    if field.source == "*" or "." in field.source:
+        return None
+    # subclasses may change the representation, so types are matched exactly
+    field_type = type(field)
+    if field_type in IDENTITY_FIELDS:
+        return _identity
+    if field_type is relations.PrimaryKeyRelatedField and field.pk_field is None:
+        return _identity
+    if field_type is fields.DateField \
+            and getattr(field, "format", api_settings.DATE_FORMAT) == ISO_8601:
+        return _iso_date
+    return None
+
+
+def read_accessors(serializer):
+    """(field name, column, converter) of readable fields, None if unsupported"""
+    accessors = []
+    for field in serializer._readable_fields:  # pylint: disable=protected-access
+        converter = field_converter(field)
+        if converter is None:
+            return None
+        accessors.append((field.field_name, field.source, converter))
+    return tuple(accessors)
+
+
+def requested_fields(value, readable):
+    """Names of ?fields= value, all of them must be readable"""
+    names = {name.strip() for name in value.split(",")} - {""}
+    if not names:
+        raise ValidationError({"fields": "At least one field is required."})
+    unknown = names - set(readable)
+    if unknown:
+        raise ValidationError({
+            "fields": f"Unknown fields {', '.join(sorted(unknown))}, "
+                      f"must be from {', '.join(readable)}."
+        })
+    return names
+
+
+class FastReadMixin:
+    """List and retrieve from .values() rows when the serializer allows it"""
+    fast_read = True
+    fields_param = "fields"
+    _read_accessors = {}
+
+    def _requested_fields(self, readable):
+        """Names of ?fields= on list and retrieve, None for all fields"""
+        # schema generation builds serializers without a request
+        request = getattr(self, "request", None)
+        if request is None or getattr(self, "action", None) not in ("list", "retrieve"):
+            return None
+        value = request.query_params.get(self.fields_param)
+        if value is None:
+            return None
+        return requested_fields(value, readable)
+
+    def get_read_accessors(self):
+        """Accessors of the requested fields, None to use the regular path"""
+        if not self.fast_read:
+            return None
+        serializer_class = self.get_serializer_class()
+        if serializer_class not in self._read_accessors:
+            self._read_accessors[serializer_class] = read_accessors(serializer_class())
+        accessors = self._read_accessors[serializer_class]
+        if accessors is None:
+            return None
+        names = self._requested_fields([name for name, _, _ in accessors])
+        if names is None:
+            return accessors
+        return tuple(accessor for accessor in accessors if accessor[0] in names)
+
+    def get_serializer(self, *args, **kwargs):
+        """Serializer of the regular path without the fields not requested"""
+        serializer = super().get_serializer(*args, **kwargs)
+        child = getattr(serializer, "child", serializer)
+        readable_fields = child._readable_fields  # pylint: disable=protected-access
+        readable = [field.field_name for field in readable_fields]
+        names = self._requested_fields(readable)
+        if names is not None:
+            for name in set(readable) - names:
+                child.fields.pop(name)
+        return serializer
+
+    @staticmethod
+    def _columns(accessors, ordering=()):
+        """Columns to select, the ordering ones are needed by cursor pagination"""
+        columns = [column for _, column, _ in accessors]
+        for field in ordering:
+            if field.lstrip("-") not in columns:
+                columns.append(field.lstrip("-"))
+        return columns
+
+    @staticmethod
+    def _represent(accessors, rows):
+        """Output data of rows"""
+        return [
+            {name: convert(row[column]) for name, column, convert in accessors}
+            for row in rows
+        ]
+
+    def list(self, request, *args, **kwargs):
+        """Regular list output built without model instances"""
+        accessors = self.get_read_accessors()
+        if accessors is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        get_ordering = getattr(self.paginator, "get_ordering", None)
+        ordering = get_ordering(request, queryset, self) if get_ordering else ()
+        rows = queryset.values(*self._columns(accessors, ordering))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self._represent(accessors, page))
+        return Response(self._represent(accessors, rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        """Regular retrieve output built without a model instance"""
+        accessors = self.get_read_accessors()
+        if accessors is None:
+            return super().retrieve(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            queryset.values(*self._columns(accessors)),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(request, row)
+        return Response(self._represent(accessors, [row])[0])
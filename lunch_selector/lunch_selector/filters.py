@@ -0,0 +1,103 @@
+"""Query parameter filtering and ordering limited to indexed lookups"""
+from rest_framework.exceptions import ValidationError
+
+EQUAL = "equal"
+RANGE = "range"
+
+
+def prefix_range(prefix):
+    """Bounds of strings starting with prefix, usable by a plain index
+
+    SQLite's LIKE is case insensitive and skips binary collated indexes,
+    so a prefix is searched as prefix <= value < prefix with last char + 1.
+    The match is case sensitive.
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def index_supports(columns, equal, range_column=None, ordering=None):
+    """Whether an index on columns serves the lookups without scanning the table
+
+    The equality columns must be a leading part of the index, followed by
+    the range column, the ordering must follow the index order after them.
+    """
+    if set(columns[:len(equal)]) != set(equal):
+        return False
+    rest = columns[len(equal):]
+    if range_column is not None:
+        return bool(rest) and rest[0] == range_column and ordering in (None, range_column)
+    return ordering is None or (bool(rest) and rest[0] == ordering)
+
+
+class IndexedFilterBackend:
+    """Filter and order by query parameters the view declares
+
+    ``filter_params`` maps a query parameter to (index column, kind, lookup,
+    parser), kind is EQUAL or RANGE. ``ordering_fields`` are the fields
+    ?ordering= accepts, with a leading - for descending order. A request is
+    rejected unless one of ``filter_indexes``, the column tuples of the
+    model's indexes, serves its filters and ordering. ``default_ordering``
+    breaks ties and orders when ?ordering= is missing.
+    """
+    default_ordering = ("-id",)
+
+    @staticmethod
+    def _parse(view, request):
+        """Lookups, equality columns, range column and ordering field of request"""
+        lookups, equal, ranges = {}, set(), set()
+        for param, (column, kind, lookup, parser) in view.filter_params.items():
+            if param not in request.query_params:
+                continue
+            value = parser(request.query_params[param], param)
+            if kind == RANGE and isinstance(lookup, tuple):
+                lookups.update(zip(lookup, prefix_range(value)))
+            else:
+                lookups[lookup] = value
+            (equal if kind == EQUAL else ranges).add(column)
+        if len(ranges) > 1:
+            raise ValidationError(
+                {"detail": "Only one range filter can be used at a time."}
+            )
+
+        ordering = request.query_params.get("ordering")
+        if ordering is not None and ordering.lstrip("-") not in view.ordering_fields:
+            raise ValidationError(
+                {"ordering": f"Must be one of {', '.join(view.ordering_fields)}."}
+            )
+        return lookups, equal, next(iter(ranges), None), ordering
+
+    def filter_queryset(self, request, queryset, view):
+        """Apply indexed filters, reject lookups no index serves"""
+        lookups, equal, range_column, ordering = self._parse(view, request)
+        if not lookups and ordering is None:
+            return queryset
+        ordering_column = ordering.lstrip("-") if ordering else None
+        if not any(
+                index_supports(columns, equal, range_column, ordering_column)
+                for columns in view.filter_indexes):
+            raise ValidationError(
+                {"detail": "This combination of filters and ordering is not indexed."}
+            )
+        return queryset.filter(**lookups)
+
+    def get_ordering(self, request, queryset, view):  # pylint: disable=unused-argument
+        """Ordering used by the cursor pagination"""
+        ordering = request.query_params.get("ordering")
+        if ordering is None or ordering.lstrip("-") not in view.ordering_fields:
+            return self.default_ordering
+        return (ordering,) + self.default_ordering
+
+
+def text(value, name):
+    """Non empty string query parameter"""
+    if not value:
+        raise ValidationError({name: "This field may not be blank."})
+    return value
+
+
+def integer(value, name):
+    """Integer query parameter"""
+    try:
+        return int(value)
+    except ValueError as exc:
+        raise ValidationError({name: "A valid integer is required."}) from exc
@@ -0,0 +1,140 @@
+"""Idempotency-Key support of create and update actions
+
+A client retrying a request sends the same Idempotency-Key header. The first
+response with that key is cached per user for IDEMPOTENCY["TIMEOUT"]
+seconds, a retry gets it back before any validation or database work.
+Reusing a key for a different request is refused with 422, a retry while the
+first request is still running with 409. Server errors are not stored, so
+they can be retried with the same key. Responses are kept in their own cache
+alias, IDEMPOTENCY["CACHE"], so other cached values do not evict them.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+# headers of the original response a replay carries too
+STORED_HEADERS = ("Location",)
+
+
+class IdempotencyKeyReused(APIException):
+    """Key was sent before with another request"""
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = f"{HEADER} was already used for a different request."
+    default_code = "idempotency_key_reused"
+
+
+class IdempotencyKeyInProgress(APIException):
+    """Request with the same key has not finished yet"""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = f"A request with this {HEADER} is still in progress."
+    default_code = "idempotency_key_in_progress"
+
+
+class Replay(Exception):
+    """Stored response of a repeated key, ends the request early"""
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+def fingerprint(request):
+    """Hash of method, path and parsed data of request"""
+    data = request.data
+    if hasattr(data, "lists"):
+        data = dict(data.lists())
+    content = json.dumps(
+        [request.method, request.path, data], sort_keys=True, default=str
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _cache():
+    """Cache of stored responses and locks"""
+    return caches[settings.IDEMPOTENCY["CACHE"]]
+
+
+def _keys(user_id, key):
+    """Stored response and lock keys of key sent by user"""
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f"idempotency-{user_id}-{digest}", f"idempotency-lock-{user_id}-{digest}"
+
+
+class IdempotencyMixin:
+    """Replay the stored response of a repeated Idempotency-Key
+
+    Keys are checked after authentication and permissions, so a key only
+    ever returns responses of the same user.
+    """
+    idempotent_actions = ("create", "update", "partial_update")
+    _idempotency = None
+
+    def initial(self, request, *args, **kwargs):
+        """Return the stored response of a repeated key"""
+        super().initial(request, *args, **kwargs)
+        key = request.headers.get(HEADER)
+        if key is None or self.action not in self.idempotent_actions:
+            return
+        max_length = settings.IDEMPOTENCY["MAX_KEY_LENGTH"]
+        if not key or len(key) > max_length:
+            raise ValidationError({HEADER: f"Must be 1 to {max_length} characters."})
+
+        response_key, lock_key = _keys(request.user.pk, key)
+        request_fingerprint = fingerprint(request)
+        cache = _cache()
+        stored = cache.get(response_key)
+        if stored is None:
+            if not cache.add(lock_key, request_fingerprint,
+                             timeout=settings.IDEMPOTENCY["LOCK_TIMEOUT"]):
+                if cache.get(lock_key) != request_fingerprint:
+                    raise IdempotencyKeyReused()
+                raise IdempotencyKeyInProgress()
+            self._idempotency = (response_key, lock_key, request_fingerprint)
+            return
+        if stored["fingerprint"] != request_fingerprint:
+            raise IdempotencyKeyReused()
+        response = Response(stored["data"], status=stored["status"])
+        for name, value in stored["headers"].items():
+            response[name] = value
+        response[REPLAYED_HEADER] = "true"
+        raise Replay(response)
+
+    def handle_exception(self, exc):
+        """Stored response instead of an error for a replay"""
+        if isinstance(exc, Replay):
+            return exc.response
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            # finalize_response is skipped for unhandled errors
+            self._release_key()
+            raise
+
+    def _release_key(self):
+        """Let requests with the key of this request run again"""
+        if self._idempotency is not None:
+            _cache().delete(self._idempotency[1])
+            self._idempotency = None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Store the response of a new key, release the key"""
+        if self._idempotency is not None:
+            response_key, _, request_fingerprint = self._idempotency
+            # only DRF responses carry data to store
+            if response.status_code < 500 and hasattr(response, "data"):
+                _cache().set(response_key, {
+                    "fingerprint": request_fingerprint,
+                    "status": response.status_code,
+                    "data": response.data,
+                    "headers": {name: response[name]
+                                for name in STORED_HEADERS if name in response},
+                }, timeout=settings.IDEMPOTENCY["TIMEOUT"])
+            self._release_key()
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,103 @@
+"""Logging handlers and filters that keep log output off the request path
+
+QueueListenerHandler only puts records on a queue, a listener thread hands
+them to the real handlers, so a slow disk never delays a request. The
+message is merged with its arguments before it is queued, like QueueHandler
+does, so later changes of the arguments do not show up in the log. When the
+queue is full records are dropped and counted in the log_records_dropped_total
+metric. Closing the handler, which logging does at exit, logs the dropped
+count and stops the listener once the queued records are written.
+"""
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+import random
+
+from lunch_selector import metrics
+
+
+class BlockingStopListener(logging.handlers.QueueListener):
+    """Queue listener whose stop waits for room in a full queue"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class QueueListenerHandler(logging.handlers.QueueHandler):
+    """Queue records for handlers served by a background listener thread
+
+    handlers are handler objects, in dictConfig "cfg://handlers.<name>" of
+    handlers whose names sort before this handler's name.
+    """
+
+    def __init__(self, handlers, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.dropped = 0
+        # dictConfig converts "cfg://" references on item access, not on iteration
+        handlers = [handlers[index] for index in range(len(handlers))]
+        self.listener = BlockingStopListener(
+            self.queue, *handlers, respect_handler_level=True
+        )
+        self.listener.start()
+
+    def prepare(self, record):
+        """Copy of record with the message merged with its arguments"""
+        message = self.format(record)
+        record = copy.copy(record)
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+    def enqueue(self, record):
+        """Drop the record rather than wait when the listener falls behind"""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.increment("log_records_dropped_total", handler=self.name)
+
+    def close(self):
+        """Log the dropped count, stop the listener after it handled the queue"""
+        self.acquire()
+        try:
+            if self.listener is not None:
+                if self.dropped:
+                    self.queue.put(self.prepare(logging.makeLogRecord({
+                        "name": __name__,
+                        "levelno": logging.WARNING,
+                        "levelname": logging.getLevelName(logging.WARNING),
+                        "msg": "%s log records were dropped, the queue was full",
+                        "args": (self.dropped,),
+                    })))
+                self.listener.stop()
+                self.listener = None
+        finally:
+            self.release()
+        super().close()
+
+
+class RotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotating file handler creating the log directory when the file is opened
+
+    With delay, nothing touches the file system before the first record.
+    """
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class SamplingFilter(logging.Filter):
+    """Keep rate of the records below WARNING, all others pass"""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
@@ -0,0 +1,44 @@
+"""Generate schema django management commands
+Usage:
+python manage.py generate_schema
+
+Writes the OpenAPI schema of all endpoints to API_SCHEMA["FILE"], run it at
+build or deploy time.
+"""
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson
+from drf_yasg.generators import OpenAPISchemaGenerator
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from lunch_selector.schema import API_INFO
+
+
+class Command(BaseCommand):
+    """generate_schema command class"""
+    help = "Write the OpenAPI schema to a file served by /swagger.json"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", type=Path, default=None)
+
+    def handle(self, *args, **options):
+        """generate_schema command logic here"""
+        path = options["output"] or settings.API_SCHEMA["FILE"]
+        # an empty url leaves host and scheme out, clients use the serving host
+        generator = OpenAPISchemaGenerator(openapi.Info(**API_INFO), url="")
+        # views build their querysets for an anonymous user
+        request = APIView().initialize_request(APIRequestFactory().get("/swagger.json"))
+        schema = generator.get_schema(request=request, public=True)
+        content = OpenAPICodecJson(validators=[]).encode(schema)
+
+        # replace atomically, workers never serve a partly written file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f".{path.name}.tmp")
+        temporary.write_bytes(content)
+        os.replace(temporary, path)
+        self.stdout.write(f"Schema written to {path}")
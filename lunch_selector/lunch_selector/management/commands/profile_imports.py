@@ -0,0 +1,77 @@
+"""Profile imports django management commands
+Usage:
+python manage.py profile_imports --top 20
+
+Boots django and imports the URL configuration in a fresh interpreter with
+python -X importtime, like a worker does before its first request, and
+reports the import time per top level package.
+"""
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+BOOT_CODE = (
+    "import importlib, sys, django; django.setup(); "
+    "[importlib.import_module(module) for module in sys.argv[1:]]"
+)
+
+
+def parse_importtime(output):
+    """(self microseconds, cumulative microseconds, module) of -X importtime output"""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_time, cumulative, module = line[len("import time:"):].split("|")
+        imports.append((int(self_time), int(cumulative), module.strip()))
+    return imports
+
+
+def package_times(imports):
+    """Self import time and module count per top level package"""
+    packages = defaultdict(lambda: [0, 0])
+    for self_time, _, module in imports:
+        package = packages[module.split(".")[0]]
+        package[0] += self_time
+        package[1] += 1
+    return packages
+
+
+class Command(BaseCommand):
+    """profile_imports command class"""
+    help = "Report import time of worker boot per package"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=20)
+        parser.add_argument(
+            "--module", action="append", dest="modules",
+            help="module to import after django.setup(), default ROOT_URLCONF"
+        )
+
+    def handle(self, *args, **options):
+        """profile_imports command logic here"""
+        modules = options["modules"] or [settings.ROOT_URLCONF]
+        # the child inherits the environment and with it the settings module
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", BOOT_CODE, *modules],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=False
+        )
+        if process.returncode:
+            raise CommandError(f"Boot failed:\n{process.stderr[-2000:]}")
+
+        imports = parse_importtime(process.stderr)
+        packages = package_times(imports)
+        total = sum(self_time for self_time, _, _ in imports)
+        self.stdout.write(f"{'package':<32} {'ms':>9} {'share':>7} {'modules':>8}")
+        ranked = sorted(packages.items(), key=lambda item: item[1][0], reverse=True)
+        for package, (self_time, count) in ranked[:options["top"]]:
+            self.stdout.write(
+                f"{package:<32} {self_time / 1000:>9.1f} "
+                f"{self_time / max(total, 1):>7.1%} {count:>8}"
+            )
+        self.stdout.write(
+            f"{'total':<32} {total / 1000:>9.1f} {1:>7.1%} {len(imports):>8}"
+        )
@@ -0,0 +1,259 @@
+"""Request metrics in Prometheus text format
+
+Every thread records into its own registry, so recording takes no lock.
+When a thread ends, its registry is added to a shared total of finished
+threads, so the number of registries stays bounded by the live threads.
+The total and the registries of live threads are summed when the metrics
+endpoint is read. With METRICS["ENABLED"] off the middleware is
+removed from the stack, recording does nothing and the endpoint answers 404.
+"""
+import threading
+import time
+import weakref
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import Http404, HttpResponse
+
+PREFIX = "lunch_selector"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# name: (type, help, histogram buckets)
+DEFINITIONS = {
+    "http_requests_total": (
+        "counter", "Requests by route, method and status", None
+    ),
+    "http_request_duration_seconds": (
+        "histogram", "Request latency by route and method", LATENCY_BUCKETS
+    ),
+    "http_response_size_bytes": (
+        "histogram", "Response body size by route and method", SIZE_BUCKETS
+    ),
+    "db_queries_total": (
+        "counter", "Database queries run by requests", None
+    ),
+    "db_query_duration_seconds_total": (
+        "counter", "Time requests spent in database queries", None
+    ),
+    "cache_requests_total": (
+        "counter", "Cache lookups by cache and result (hit, stale, miss)", None
+    ),
+    "log_records_dropped_total": (
+        "counter", "Log records dropped by handler because its queue was full", None
+    ),
+}
+
+
+class Registry:
+    """Counters and histograms recorded by one thread"""
+
+    def __init__(self):
+        self.counters = defaultdict(float)
+        self.histograms = {}
+
+    def increment(self, name, labels, amount=1):
+        """Add amount to counter"""
+        self.counters[(name, labels)] += amount
+
+    def observe(self, name, labels, value):
+        """Count value in histogram, the last two slots hold sum and count"""
+        buckets = DEFINITIONS[name][2]
+        histogram = self.histograms.get((name, labels))
+        if histogram is None:
+            histogram = self.histograms[(name, labels)] = [0] * (len(buckets) + 2)
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                histogram[index] += 1
+                break
+        histogram[-2] += value
+        histogram[-1] += 1
+
+    def merge(self, counters, histograms):
+        """Add counters and histograms of another registry"""
+        for key, value in counters.items():
+            self.counters[key] += value
+        for key, histogram in histograms.items():
+            total = self.histograms.setdefault(key, [0] * len(histogram))
+            for index, value in enumerate(histogram):
+                total[index] += value
+
+    def clear(self):
+        """Drop all values"""
+        self.counters.clear()
+        self.histograms.clear()
+
+
+_local = threading.local()
+# registries of live threads, a registry leaves with its thread
+_registries = weakref.WeakSet()
+# values of finished threads
+_retired = Registry()
+# reentrant, a registry may be retired while its thread's lock is held
+_registries_lock = threading.RLock()
+
+
+def enabled():
+    """Whether metrics are recorded"""
+    return settings.METRICS["ENABLED"]
+
+
+def registry():
+    """Registry of the current thread"""
+    try:
+        return _local.registry
+    except AttributeError:
+        _local.registry = Registry()
+        with _registries_lock:
+            _registries.add(_local.registry)
+        weakref.finalize(
+            _local.registry, _retire,
+            _local.registry.counters, _local.registry.histograms,
+        )
+        return _local.registry
+
+
+def _retire(counters, histograms):
+    """Keep values of the registry of a finished thread"""
+    with _registries_lock:
+        _retired.merge(counters, histograms)
+
+
+def increment(name, amount=1, **labels):
+    """Add amount to counter name with labels"""
+    if enabled():
+        registry().increment(name, tuple(labels.items()), amount)
+
+
+def observe(name, value, **labels):
+    """Record value in histogram name with labels"""
+    if enabled():
+        registry().observe(name, tuple(labels.items()), value)
+
+
+def reset():
+    """Drop values recorded by all threads"""
+    with _registries_lock:
+        _retired.clear()
+        for thread_registry in list(_registries):
+            thread_registry.clear()
+
+
+def collect():
+    """Sum of counters and histograms of all threads"""
+    total = Registry()
+    with _registries_lock:
+        for thread_registry in [_retired, *_registries]:
+            # dict copies are atomic, the recording thread may go on meanwhile
+            total.merge(
+                thread_registry.counters.copy(), thread_registry.histograms.copy()
+            )
+    return total.counters, total.histograms
+
+
+def _escape(value):
+    """Label value escaped for the text format"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, extra=()):
+    """Prometheus label set"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in labels + extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    """Integral values without a fraction"""
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render():
+    """All metrics in Prometheus text format"""
+    counters, histograms = collect()
+    lines = []
+    for name, (metric_type, description, buckets) in DEFINITIONS.items():
+        full_name = f"{PREFIX}_{name}"
+        lines.append(f"# HELP {full_name} {description}")
+        lines.append(f"# TYPE {full_name} {metric_type}")
+        if buckets is None:
+            for (key, labels), value in sorted(counters.items()):
+                if key == name:
+                    lines.append(f"{full_name}{_labels(labels)} {_number(value)}")
+            continue
+        for (key, labels), histogram in sorted(histograms.items()):
+            if key != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, histogram):
+                cumulative += count
+                lines.append(
+                    f"{full_name}_bucket{_labels(labels, (('le', bound),))} {cumulative}"
+                )
+            lines.append(
+                f"{full_name}_bucket{_labels(labels, (('le', '+Inf'),))} {histogram[-1]}"
+            )
+            lines.append(f"{full_name}_sum{_labels(labels)} {_number(histogram[-2])}")
+            lines.append(f"{full_name}_count{_labels(labels)} {histogram[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+class QueryRecorder:
+    """Database execute wrapper counting queries and their time"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, *args):
+        start = time.perf_counter()
+        try:
+            return execute(*args)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """Record latency, queries and response size of every request"""
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        labels = (("route", match.view_name if match else "unmatched"),
+                  ("method", request.method))
+        thread_registry = registry()
+        thread_registry.increment(
+            "http_requests_total", labels + (("status", response.status_code),)
+        )
+        thread_registry.observe("http_request_duration_seconds", labels, elapsed)
+        thread_registry.increment("db_queries_total", labels, recorder.count)
+        thread_registry.increment(
+            "db_query_duration_seconds_total", labels, recorder.duration
+        )
+        # streamed bodies are produced after the middleware returns
+        if not response.streaming:
+            thread_registry.observe(
+                "http_response_size_bytes", labels, len(response.content)
+            )
+        return response
+
+
+def metrics_view(request):
+    """Metrics of this process for Prometheus, only for METRICS["ALLOWED_IPS"]"""
+    if not enabled() \
+            or request.META.get("REMOTE_ADDR") not in settings.METRICS["ALLOWED_IPS"]:
+        raise Http404
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
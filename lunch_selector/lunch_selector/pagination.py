@@ -0,0 +1,66 @@
+"""Pagination of list endpoints"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination on the primary key, newest first
+
+    Each page is read with an indexed "id < cursor" lookup, so its cost does
+    not grow with the position and rows inserted meanwhile never shift pages.
+    Page size is REST_FRAMEWORK["PAGE_SIZE"] unless the client asks for
+    ?page_size= up to max_page_size.
+
+    A cursor on a column that changes while clients page skips or repeats
+    rows, so orderings by the view's ``offset_ordering_fields`` are paged
+    with ?page= instead, with the same response shape.
+    """
+    ordering = "-id"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    page_query_param = "page"
+    # page number of offset pagination, None for the cursor
+    page_number = None
+    request = None
+    has_next = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Page of queryset, by cursor or by page number"""
+        ordering = self.get_ordering(request, queryset, view)
+        if ordering[0].lstrip("-") not in getattr(view, "offset_ordering_fields", ()):
+            self.page_number = None
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        value = request.query_params.get(self.page_query_param, "1")
+        if not value.isdigit() or int(value) < 1:
+            raise ValidationError(
+                {self.page_query_param: "Must be a positive integer."}
+            )
+        self.page_number = int(value)
+        offset = (self.page_number - 1) * self.page_size
+        page = list(queryset.order_by(*ordering)[offset:offset + self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        return page[:self.page_size]
+
+    def get_next_link(self):
+        """Link of the next page"""
+        if self.page_number is None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.page_query_param, self.page_number + 1
+        )
+
+    def get_previous_link(self):
+        """Link of the previous page"""
+        if self.page_number is None:
+            return super().get_previous_link()
+        if self.page_number == 1:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.page_query_param, self.page_number - 1
+        )
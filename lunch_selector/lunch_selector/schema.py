@@ -0,0 +1,80 @@
+"""OpenAPI schema served from a file generated at build time
+
+Generating the schema introspects every viewset and serializer, so it is
+written once by the generate_schema command and /swagger.json serves that
+file with a strong ETag. Only with API_SCHEMA["LIVE"] the swagger UI asks
+drf_yasg for a schema generated on each request, for development.
+
+Importing drf_yasg takes a good part of the startup time, so it is only
+imported when the UI is enabled with API_SCHEMA["UI"] or the schema is
+generated.
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
+
+API_INFO = {
+    "title": "Lunch Selector API",
+    "default_version": "v1",
+    "description": "Endpoints of Lunch Selector application",
+}
+
+_lock = threading.Lock()
+_loaded = {"stat": None, "content": None, "etag": None}
+
+
+def load_schema():
+    """Content and ETag of the schema file, read again only when it changed"""
+    path = settings.API_SCHEMA["FILE"]
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None, None
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if _loaded["stat"] != key:
+            content = path.read_bytes()
+            _loaded.update(
+                stat=key, content=content, etag=hashlib.sha256(content).hexdigest()
+            )
+        return _loaded["content"], _loaded["etag"]
+
+
+def schema_etag(request):  # pylint: disable=unused-argument
+    """Strong ETag of the schema file"""
+    return load_schema()[1]
+
+
+@require_safe
+@condition(etag_func=schema_etag)
+def schema_file_view(request):  # pylint: disable=unused-argument
+    """Generated schema, clients revalidate it with If-None-Match"""
+    content, _ = load_schema()
+    if content is None:
+        raise Http404("Schema file missing, run python manage.py generate_schema")
+    response = HttpResponse(content, content_type="application/json")
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def swagger_view():
+    """Swagger UI view, loading the generated file unless API_SCHEMA["LIVE"]"""
+    # pylint: disable=import-outside-toplevel
+    from drf_yasg import openapi
+    from drf_yasg.renderers import SwaggerUIRenderer
+    from drf_yasg.views import get_schema_view
+    from rest_framework import permissions
+
+    schema_view = get_schema_view(
+        openapi.Info(**API_INFO),
+        public=True,
+        permission_classes=(permissions.AllowAny,)
+    )
+    if settings.API_SCHEMA["LIVE"]:
+        return schema_view.with_ui("swagger", cache_timeout=0)
+    # the UI loads the generated file, the schema is never generated per request
+    return schema_view.as_cached_view(renderer_classes=(SwaggerUIRenderer,))
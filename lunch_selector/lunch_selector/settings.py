@@ -39,12 +39,18 @@ INSTALLED_APPS = [
     "user",
     "restaurant",
     "vote",
+    "archive",
+    "lunch_selector",
     "rest_framework.authtoken",
-    "drf_yasg",
 ]
 AUTH_USER_MODEL = "user.SelectorUser"
+AUTHENTICATION_BACKENDS = [
+    "user.backends.UserTypePermissionBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
 
 MIDDLEWARE = [
+    "lunch_selector.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -84,6 +90,29 @@ DATABASES = {
     }
 }
 
+# Cache
+# Tokens, permissions, vote result and leaderboard entries are cached in "default", stored
+# responses of idempotency keys in "idempotency", so they are not evicted by the others.
+# The default is a memory cache of this process holding up to CACHE_MAX_ENTRIES keys per
+# alias, with more than one worker set CACHE_BACKEND to a shared backend (for example
+# django.core.cache.backends.memcached.PyMemcacheCache) and CACHE_LOCATION to its address
+CACHE_BACKEND = os.environ.get(
+    "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+)
+CACHES = {
+    alias: {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.environ.get("CACHE_LOCATION", f"lunch_selector-{alias}"),
+        "KEY_PREFIX": alias,
+    }
+    for alias in ("default", "idempotency")
+}
+if CACHE_BACKEND == "django.core.cache.backends.locmem.LocMemCache":
+    for cache_config in CACHES.values():
+        cache_config["OPTIONS"] = {
+            "MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", 100000)),
+        }
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -134,14 +163,112 @@ REST_FRAMEWORK = {
         "user.permissions.CustomDjangoModelPermissions",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "user.authentication.CachedTokenAuthentication",
     ],
+    "DEFAULT_PAGINATION_CLASS": "lunch_selector.pagination.IdCursorPagination",
+    "PAGE_SIZE": 100,
     "TEST_REQUEST_DEFAULT_FORMAT": "json"
 }
 
+# Token authentication
+# Tokens expire LIFETIME seconds after creation (None for never), resolved tokens
+# are cached CACHE_TIMEOUT seconds. Logout clears the cached token of its own process
+# only, unless CACHES holds a shared backend other workers keep accepting the token
+# for up to CACHE_TIMEOUT seconds
+TOKEN_AUTH = {
+    "LIFETIME": 7 * 24 * 60 * 60,
+    "CACHE_TIMEOUT": 5 * 60,
+}
+
+# Vote ingestion
+# With GROUP_COMMIT votes are committed in batches by a single writer thread.
+# MAX_WAIT and TIMEOUT are in seconds
+VOTE_INGESTION = {
+    "GROUP_COMMIT": os.environ.get("VOTE_GROUP_COMMIT", "False") == "True",
+    "BATCH_SIZE": 64,
+    "MAX_WAIT": 0.005,
+    "TIMEOUT": 10,
+}
+
+# Vote result
+# ENGINE "leaderboard" keeps today's votes in memory, "sql" computes the result in one
+# query and "python" recomputes it from menus.
+# Leaderboard needs a cache shared by all workers. Recomputed results are cached per day,
+# served CACHE_SOFT_TTL before a background refresh and kept CACHE_TIMEOUT at most.
+# A restaurant can not win STREAK_LENGTH consecutive days. All durations are in seconds
+VOTE_RESULT = {
+    "ENGINE": "leaderboard",
+    "STREAK_LENGTH": 3,
+    "LEADERBOARD_MAX_AGE": 60,
+    "CACHE_SOFT_TTL": 30,
+    "CACHE_TIMEOUT": 60 * 60,
+    "CACHE_LOCK_TIMEOUT": 30,
+    "CACHE_WAIT": 5,
+}
+
+# Metrics
+# Request latency, query counts, response sizes and cache hit rates are recorded per
+# process and served in Prometheus text format from /metrics/ to ALLOWED_IPS.
+# Without ENABLED the middleware is not loaded and nothing is recorded
+METRICS = {
+    "ENABLED": os.environ.get("METRICS_ENABLED", "False") == "True",
+    "ALLOWED_IPS": ["127.0.0.1", "::1"],
+}
+
+# Archive
+# Menus and votes older than HORIZON_DAYS are moved to archive tables, BATCH_SIZE rows
+# at a time
+ARCHIVE = {
+    "HORIZON_DAYS": 90,
+    "BATCH_SIZE": 1000,
+}
+
+# Idempotency
+# Vote and menu create and update responses to requests with an Idempotency-Key header
+# are kept TIMEOUT seconds per user and key, a retry with the key gets the same response.
+# A key is held LOCK_TIMEOUT seconds at most by a running request. Responses are kept in
+# the CACHE alias, workers need it to be shared to recognize retries handled by another
+# worker, and it must hold a day of keys without evicting them
+IDEMPOTENCY = {
+    "CACHE": "idempotency",
+    "TIMEOUT": 24 * 60 * 60,
+    "LOCK_TIMEOUT": 30,
+    "MAX_KEY_LENGTH": 255,
+}
+
+# User permissions
+# Group permissions per user_type are kept in every worker. Changes reach other workers
+# through a shared cache, without one after MAX_AGE seconds at most
+USER_PERMISSIONS = {
+    "MAX_AGE": 60,
+}
+
+# User import
+# Passwords of imported users are hashed by WORKERS processes, users and their group
+# memberships are inserted BATCH_SIZE rows at a time. Uploads to /user/import/ may have
+# REQUEST_MAX_ROWS rows, larger files are imported with the import_users command
+USER_IMPORT = {
+    "WORKERS": int(os.environ.get("USER_IMPORT_WORKERS", os.cpu_count() or 1)),
+    "BATCH_SIZE": 500,
+    "REQUEST_MAX_ROWS": 100,
+}
+
+# API schema
+# The schema is generated into FILE by the generate_schema command and served from
+# /swagger.json. UI adds the swagger UI, without it drf_yasg is not loaded by workers.
+# With LIVE, for development, the swagger UI generates the schema on each request
+API_SCHEMA = {
+    "FILE": Path(os.environ.get("API_SCHEMA_FILE", BASE_DIR / "openapi.json")),
+    "UI": os.environ.get("API_SCHEMA_UI", "True") == "True",
+    "LIVE": os.environ.get("API_SCHEMA_LIVE", "False") == "True",
+}
+if API_SCHEMA["UI"]:
+    INSTALLED_APPS.append("drf_yasg")
+
 # Swagger
 SWAGGER_SETTINGS = {
     "USE_SESSION_AUTH": False,
+    "SPEC_URL": None if API_SCHEMA["LIVE"] else "api-schema",
     "SECURITY_DEFINITIONS": {
         "Token": {
             "type": "apiKey",
@@ -152,14 +279,19 @@ SWAGGER_SETTINGS = {
 }
 
 # Logging
+# The log file and its directory are created on the first record
 LOG_FILE = os.environ.get("LOG_FILE", f"{Path.home()}/.log/lunch-selector.log")
-if not os.path.exists(LOG_FILE):
-    try:
-        os.makedirs(os.path.dirname(LOG_FILE))
-        with open(LOG_FILE, "w"):
-            pass
-    except FileExistsError:
-        pass
+
+# Records are queued and written by listener threads, so requests never wait for
+# output. Log files rotate at LOG_MAX_BYTES keeping LOG_BACKUP_COUNT old files.
+# LOG_SAMPLE_RATES keeps that share of the INFO and DEBUG records of hot loggers
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_SAMPLE_RATES = {
+    "vote.serializers": float(os.environ.get("LOG_VOTE_SAMPLE_RATE", "0.1")),
+}
+# Loggers of the project packages, these write INFO and above to the log file
+APP_LOGGERS = ("lunch_selector", "user", "restaurant", "vote", "archive")
 
 LOGGING = {
     "version": 1,
@@ -169,9 +301,14 @@ LOGGING = {
             "format": "%(asctime)s %(name)-12s %(levelname)-8s %(message)s",
         },
         "simple": {
-            "format": "%(levelname) %(message)",
+            "format": "%(levelname)s %(message)s",
         },
     },
+    "filters": {
+        f"sample_{name}": {"()": "lunch_selector.log.SamplingFilter", "rate": rate}
+        for name, rate in LOG_SAMPLE_RATES.items()
+    },
+    # queue handlers refer to the handlers they feed, which must sort before them
     "handlers": {
         "console": {
             "level": "INFO",
@@ -180,21 +317,46 @@ LOGGING = {
         },
         "file": {
             "level": "DEBUG",
-            "class": "logging.FileHandler",
+            "class": "lunch_selector.log.RotatingFileHandler",
             "formatter": "console",
             "filename": LOG_FILE,
-        }
+            "maxBytes": LOG_MAX_BYTES,
+            "backupCount": LOG_BACKUP_COUNT,
+            "delay": True,
+        },
+        "queue_console": {
+            "class": "lunch_selector.log.QueueListenerHandler",
+            "handlers": ["cfg://handlers.console"],
+        },
+        "queue_file": {
+            "class": "lunch_selector.log.QueueListenerHandler",
+            "handlers": ["cfg://handlers.file"],
+        },
     },
     "loggers": {
         "django": {
-            "handlers": ["file"],
+            "handlers": ["queue_file"],
             "level": "DEBUG",
             "propagate": True,
         },
         "app": {
-            "handlers": ["console"],
+            "handlers": ["queue_console"],
             "level": "INFO",
             "propagate": True,
-        }
+        },
+        **{
+            name: {
+                "handlers": ["queue_file"],
+                "level": "INFO",
+                "propagate": False,
+            }
+            for name in APP_LOGGERS
+        },
+        **{
+            name: {
+                "filters": [f"sample_{name}"],
+            }
+            for name in LOG_SAMPLE_RATES
+        },
     }
 }
@@ -1,5 +1,10 @@
 """Custom test runner"""
+from contextlib import contextmanager
+
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.test.runner import DiscoverRunner
 from rest_framework.test import APITestCase
 
@@ -16,12 +21,47 @@ class CustomTestRunner(DiscoverRunner):
         return _return
 
 
-class CustomAPITestCase(APITestCase):
+def full_table_scans(sql):
+    """Tables read with a full scan in the query plan of sql"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}")
+        plan = cursor.fetchall()
+    tables = []
+    for row in plan:
+        detail = row[-1].split()
+        # "SCAN <table>" (or "SCAN TABLE <table>" on older sqlite) without "USING INDEX"
+        if detail[0] == "SCAN" and "USING" not in detail:
+            tables.append(detail[2] if detail[1] == "TABLE" else detail[1])
+    return tables
+
+
+class QueryPlanMixin:
+    """Check query plans of test requests"""
+
+    @contextmanager
+    def assertNoFullTableScan(self, allowed_tables=()):  # pylint: disable=invalid-name
+        """Fail if a SELECT inside the block scans a whole table
+
+        allowed_tables are the tables which are listed completely on purpose.
+        """
+        with CaptureQueriesContext(connection) as context:
+            yield
+        for query in context.captured_queries:
+            if not query["sql"].startswith("SELECT"):
+                continue
+            scans = set(full_table_scans(query["sql"])) - set(allowed_tables)
+            if scans:
+                self.fail(f"Full scan of {', '.join(sorted(scans))} in: {query['sql']}")
+
+
+class CustomAPITestCase(QueryPlanMixin, APITestCase):
     """Custom class for creating token for necessary users"""
 
     def setUp(self):
         """Override before all of test class"""
-        super().setUpClass()
+        super().setUp()
+        for cache in caches.all():
+            cache.clear()
         from rest_framework.authtoken.models import Token
         user_model = get_user_model()
 
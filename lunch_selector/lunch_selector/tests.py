@@ -0,0 +1,273 @@
+import gc
+import json
+import logging
+import os
+import tempfile
+import threading
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from lunch_selector import metrics
+from lunch_selector.log import QueueListenerHandler, RotatingFileHandler, SamplingFilter
+from lunch_selector.test_utils import CustomAPITestCase
+from restaurant.models import Menu, Restaurant
+
+
+class SchemaFileTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.schema_file = Path(directory.name) / "openapi.json"
+        settings_override = override_settings(
+            API_SCHEMA={**settings.API_SCHEMA, "FILE": self.schema_file}
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_generate_and_serve(self):
+        call_command("generate_schema", stdout=StringIO())
+        response = self.client.get(reverse("api-schema"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("no-cache", response["Cache-Control"])
+        schema = json.loads(response.content)
+        self.assertNotIn("host", schema)
+        self.assertIn("/restaurants/menus/search/", schema["paths"])
+        self.assertIn("/votes/result/", schema["paths"])
+
+        etag = response["ETag"]
+        self.assertFalse(etag.startswith("W/"))
+        response = self.client.get(reverse("api-schema"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.schema_file.write_text('{"swagger": "2.0", "paths": {}}')
+        response = self.client.get(reverse("api-schema"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(json.loads(response.content)["paths"], {})
+
+    def test_missing_file(self):
+        response = self.client.get(reverse("api-schema"))
+        self.assertEqual(response.status_code, 404)
+
+    def test_swagger_ui_uses_file(self):
+        response = self.client.get(reverse("schema-swagger-ui"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse("api-schema"))
+        response = self.client.get(reverse("schema-swagger-ui"), {"format": "openapi"})
+        self.assertEqual(response.status_code, 404)
+
+
+class BootCostTest(TestCase):
+
+    def test_profile_imports_without_docs_ui(self):
+        out = StringIO()
+        with mock.patch.dict(os.environ, {"API_SCHEMA_UI": "False"}):
+            call_command("profile_imports", "--top", "1000", stdout=out)
+        packages = [line.split()[0] for line in out.getvalue().splitlines()[1:]]
+        self.assertIn("django", packages)
+        self.assertIn("restaurant", packages)
+        self.assertNotIn("drf_yasg", packages)
+        self.assertEqual(packages[-1], "total")
+
+    def test_log_file_created_on_first_record(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        log_file = Path(directory.name) / "logs" / "app.log"
+        handler = RotatingFileHandler(log_file, maxBytes=1024, backupCount=1, delay=True)
+        self.addCleanup(handler.close)
+        self.assertFalse(log_file.parent.exists())
+        handler.emit(logging.makeLogRecord({"msg": "first", "levelno": logging.INFO}))
+        self.assertIn("first", log_file.read_text())
+
+
+@override_settings(METRICS={**settings.METRICS, "ENABLED": True})
+class MetricsTest(CustomAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+        restaurant = Restaurant.objects.create(
+            name="restaurant", manager=self.manager_instance
+        )
+        self.menu = Menu.objects.create(
+            restaurant=restaurant, name="menu", details="details"
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.employee_token.key}")
+
+    def get_metrics(self):
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        return response.content.decode().splitlines()
+
+    def test_request_metrics(self):
+        self.client.post(reverse("vote-list"), data={"menu": self.menu.id})
+        self.client.get(reverse("vote-list"))
+        self.client.get(reverse("vote-list"))
+        lines = self.get_metrics()
+        get, post = 'route="vote-list",method="GET"', 'route="vote-list",method="POST"'
+        for line in (
+                f'lunch_selector_http_requests_total{{{get},status="200"}} 2',
+                f'lunch_selector_http_requests_total{{{post},status="201"}} 1',
+                "lunch_selector_http_request_duration_seconds_bucket"
+                f'{{{get},le="+Inf"}} 2',
+                f"lunch_selector_http_request_duration_seconds_count{{{get}}} 2",
+                f"lunch_selector_http_response_size_bytes_count{{{get}}} 2",
+                "# TYPE lunch_selector_http_request_duration_seconds histogram",
+        ):
+            self.assertIn(line, lines)
+        queries = [
+            line for line in lines
+            if line.startswith(f"lunch_selector_db_queries_total{{{post}}}")
+        ]
+        self.assertGreater(int(queries[0].split()[-1]), 0)
+
+    @override_settings(VOTE_RESULT={**settings.VOTE_RESULT, "ENGINE": "sql"})
+    def test_result_cache_metrics(self):
+        url_result = reverse("vote-result")
+        self.client.get(url_result)
+        self.client.get(url_result)
+        lines = self.get_metrics()
+        labels = 'cache="vote_result"'
+        self.assertIn(
+            f'lunch_selector_cache_requests_total{{{labels},result="miss"}} 1', lines
+        )
+        self.assertIn(
+            f'lunch_selector_cache_requests_total{{{labels},result="hit"}} 1', lines
+        )
+
+    def test_finished_threads_retired(self):
+        metrics.increment("cache_requests_total", cache="vote_result", result="hit")
+        registries = metrics._registries  # pylint: disable=protected-access
+        live = len(registries)
+
+        def record():
+            metrics.increment("cache_requests_total", cache="vote_result", result="hit")
+            metrics.observe("http_request_duration_seconds", 0.001, route="a")
+
+        for _ in range(50):
+            thread = threading.Thread(target=record)
+            thread.start()
+            thread.join()
+        gc.collect()
+        self.assertEqual(len(registries), live)
+        counters, histograms = metrics.collect()
+        labels = (("cache", "vote_result"), ("result", "hit"))
+        self.assertEqual(counters[("cache_requests_total", labels)], 51)
+        self.assertEqual(
+            histograms[("http_request_duration_seconds", (("route", "a"),))][-1], 50
+        )
+        metrics.reset()
+        self.assertEqual(metrics.collect(), ({}, {}))
+
+    def test_histogram_buckets(self):
+        registry = metrics.Registry()
+        key = ("http_request_duration_seconds", (("route", "a"),))
+        for value in (0.001, 0.02, 0.02, 100):
+            registry.observe(*key, value)
+        histogram = registry.histograms[key]
+        self.assertEqual(histogram[0], 1)
+        self.assertEqual(histogram[2], 2)
+        self.assertEqual(sum(histogram[:-2]), 3)
+        self.assertEqual(histogram[-1], 4)
+
+    def test_allowed_ips(self):
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS={**settings.METRICS, "ENABLED": False})
+    def test_disabled(self):
+        self.client.get(reverse("vote-list"))
+        metrics.increment("cache_requests_total", cache="vote_result", result="hit")
+        self.assertEqual(metrics.collect(), ({}, {}))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 404)
+
+
+class LoggingTest(TestCase):
+
+    def test_vote_logger_sampled(self):
+        sampling = logging.getLogger("vote.serializers").filters
+        self.assertEqual(len(sampling), 1)
+        self.assertEqual(sampling[0].rate, settings.LOG_SAMPLE_RATES["vote.serializers"])
+
+    def test_sampling_filter(self):
+        logger = logging.getLogger("lunch_selector.tests.sampling")
+        info = logger.makeRecord(logger.name, logging.INFO, "", 0, "vote", (), None)
+        warning = logger.makeRecord(logger.name, logging.WARNING, "", 0, "vote", (), None)
+        self.assertFalse(SamplingFilter(rate=0).filter(info))
+        self.assertTrue(SamplingFilter(rate=0).filter(warning))
+        self.assertTrue(SamplingFilter(rate=1).filter(info))
+        with mock.patch("random.random", side_effect=[0.05, 0.5]):
+            sampled = SamplingFilter(rate=0.1)
+            self.assertEqual([sampled.filter(info), sampled.filter(info)], [True, False])
+
+    def test_queue_handler(self):
+        stream = StringIO()
+        target = logging.StreamHandler(stream)
+        target.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        handler = QueueListenerHandler([target], queue_size=2)
+        logger = logging.getLogger("lunch_selector.tests.queue")
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            logger.warning("vote %s", 1)
+            handler.close()
+            self.assertEqual(stream.getvalue(), "WARNING vote 1\n")
+            for number in range(3):
+                logger.warning("vote %s", number)
+            self.assertEqual(handler.dropped, 1)
+        finally:
+            logger.removeHandler(handler)
+
+    def test_queue_handler_formats_message(self):
+        stream = StringIO()
+        target = logging.StreamHandler(stream)
+        target.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        handler = QueueListenerHandler([target])
+        logger = logging.getLogger("lunch_selector.tests.queue_format")
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            votes = [1]
+            logger.warning("votes %s", votes)
+            votes.append(2)
+            handler.close()
+            self.assertEqual(stream.getvalue(), "WARNING votes [1]\n")
+        finally:
+            logger.removeHandler(handler)
+
+    @override_settings(METRICS={**settings.METRICS, "ENABLED": True})
+    def test_queue_handler_reports_dropped(self):
+        metrics.reset()
+        stream = StringIO()
+        target = logging.StreamHandler(stream)
+        target.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        handler = QueueListenerHandler([target], queue_size=1)
+        handler.set_name("queue_test")
+        handler.dropped = 2
+        handler.close()
+        self.assertEqual(
+            stream.getvalue(), "WARNING 2 log records were dropped, the queue was full\n"
+        )
+        logger = logging.getLogger("lunch_selector.tests.queue_dropped")
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            for number in range(3):
+                logger.warning("vote %s", number)
+            self.assertEqual(handler.dropped, 4)
+            self.assertIn(
+                'lunch_selector_log_records_dropped_total{handler="queue_test"} 2',
+                metrics.render(),
+            )
+        finally:
+            logger.removeHandler(handler)
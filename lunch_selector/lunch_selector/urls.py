@@ -1,26 +1,17 @@
 """lunch_selector URL Configuration"""
+from django.conf import settings
 from django.urls import path, include
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework import permissions
 
-SchemaView = get_schema_view(
-    openapi.Info(
-        title="Lunch Selector API",
-        default_version="v1",
-        description="Endpoints of Lunch Selector application",
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,)
-)
+from lunch_selector.metrics import metrics_view
+from lunch_selector.schema import schema_file_view, swagger_view
 
 urlpatterns = [
-    path(
-        "swagger/",
-        SchemaView.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui"
-    ),
+    path("swagger.json", schema_file_view, name="api-schema"),
     path("user/", include("user.urls")),
     path("restaurants/", include("restaurant.urls")),
     path("votes/", include("vote.urls")),
+    path("metrics/", metrics_view, name="metrics"),
 ]
+# drf_yasg is only imported for the docs UI
+if settings.API_SCHEMA["UI"]:
+    urlpatterns.insert(0, path("swagger/", swagger_view(), name="schema-swagger-ui"))
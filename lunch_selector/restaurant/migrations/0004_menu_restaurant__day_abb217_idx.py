@@ -0,0 +1,17 @@
+# Generated by Django 3.2.5 on 2026-10-18 07:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0003_menu_vote_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['day', 'vote_count'], name='restaurant__day_abb217_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Full text search index of menus, SQLite only
+
+from django.db import migrations
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE restaurant_menu_fts USING fts5(
+        name, details, content='restaurant_menu', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER restaurant_menu_fts_insert AFTER INSERT ON restaurant_menu BEGIN
+        INSERT INTO restaurant_menu_fts(rowid, name, details)
+        VALUES (new.id, new.name, new.details);
+    END
+    """,
+    """
+    CREATE TRIGGER restaurant_menu_fts_delete AFTER DELETE ON restaurant_menu BEGIN
+        INSERT INTO restaurant_menu_fts(restaurant_menu_fts, rowid, name, details)
+        VALUES ('delete', old.id, old.name, old.details);
+    END
+    """,
+    """
+    CREATE TRIGGER restaurant_menu_fts_update AFTER UPDATE OF name, details
+    ON restaurant_menu BEGIN
+        INSERT INTO restaurant_menu_fts(restaurant_menu_fts, rowid, name, details)
+        VALUES ('delete', old.id, old.name, old.details);
+        INSERT INTO restaurant_menu_fts(rowid, name, details)
+        VALUES (new.id, new.name, new.details);
+    END
+    """,
+    "INSERT INTO restaurant_menu_fts(restaurant_menu_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS restaurant_menu_fts_insert",
+    "DROP TRIGGER IF EXISTS restaurant_menu_fts_delete",
+    "DROP TRIGGER IF EXISTS restaurant_menu_fts_update",
+    "DROP TABLE IF EXISTS restaurant_menu_fts",
+]
+
+
+def _run(statements):
+    def _execute(apps, schema_editor):  # pylint: disable=unused-argument
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return _execute
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0004_menu_restaurant__day_abb217_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.5 on 2026-10-18 08:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0005_menu_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['name'], name='restaurant__name_681929_idx'),
+        ),
+    ]
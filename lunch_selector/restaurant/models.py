@@ -52,3 +52,7 @@ class Menu(models.Model):
 
     class Meta:  # pylint: disable=missing-class-docstring
         unique_together = ("restaurant", "day")
+        indexes = [
+            models.Index(fields=["day", "vote_count"]),
+            models.Index(fields=["name"]),
+        ]
@@ -0,0 +1,65 @@
+"""Full text search of menus
+
+On SQLite, menus are indexed in the FTS5 table restaurant_menu_fts which
+triggers keep in sync with restaurant_menu (see migration 0005_menu_search).
+SQLite rebuilds a table when a migration alters it, which drops its
+triggers, so such migrations must run 0005's CREATE statements again.
+Other databases fall back to a slow icontains scan.
+Menus moved to the archive (see archive_history) are not searched.
+"""
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import Q
+
+from restaurant.models import Menu
+
+SEARCH_SQL = """
+    SELECT menu.id, restaurant.name, menu.name, menu.details, menu.day
+    FROM restaurant_menu_fts
+    INNER JOIN restaurant_menu menu ON menu.id = restaurant_menu_fts.rowid
+    INNER JOIN restaurant_restaurant restaurant ON restaurant.id = menu.restaurant_id
+    WHERE restaurant_menu_fts MATCH %s {scope}
+    ORDER BY bm25(restaurant_menu_fts, 10.0, 1.0), menu.id DESC
+    LIMIT %s OFFSET %s
+"""
+FIELDS = ("id", "restaurant", "name", "details", "day")
+
+
+def match_expression(query):
+    """FTS5 query matching all words of query as prefixes
+
+    Every word is quoted, so user input can't use FTS5 query syntax.
+    """
+    words = query.split()
+    return " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+def search_menus(query, limit, offset=0, menus=None):
+    """Menus of the menus queryset matching all words of query, best matches first"""
+    expression = match_expression(query)
+    if not expression:
+        return []
+    if menus is None:
+        menus = Menu.objects.all()
+    if connection.vendor == "sqlite":
+        scope, scope_params = "", []
+        # unfiltered menus need no scope, which would read every menu id
+        if menus.query.where:
+            try:
+                ids = menus.order_by().values("id")
+                scope, scope_params = ids.query.sql_with_params()
+            except EmptyResultSet:
+                return []
+            scope = f"AND menu.id IN ({scope})"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                SEARCH_SQL.format(scope=scope), [expression, *scope_params, limit, offset]
+            )
+            rows = cursor.fetchall()
+    else:
+        for word in query.split():
+            menus = menus.filter(Q(name__icontains=word) | Q(details__icontains=word))
+        rows = menus.order_by("-day", "-id").values_list(
+            "id", "restaurant__name", "name", "details", "day"
+        )[offset:offset + limit]
+    return [dict(zip(FIELDS, row)) for row in rows]
@@ -13,7 +13,7 @@ class RestaurantSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """Create user after validation all"""
-        logger.info(f"Restaurant creation data: {validated_data}")
+        logger.info("Restaurant creation data: %s", validated_data)
         return super().create(validated_data)
 
     class Meta:  # pylint: disable=missing-class-docstring
@@ -27,7 +27,7 @@ class MenuSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """Create menu by restaurant manager"""
-        logger.info(f"Menu creation data: {validated_data}")
+        logger.info("Menu creation data: %s", validated_data)
         return super().create(validated_data)
 
     class Meta:  # pylint: disable=missing-class-docstring
@@ -1,16 +1,21 @@
 import copy
 import datetime
 import json
+from unittest import mock
 
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from rest_framework import serializers
 from rest_framework.exceptions import ValidationError as DrfValidationError
 
-from lunch_selector.test_utils import CustomAPITestCase
+from lunch_selector.fast_read import read_accessors
+from lunch_selector.test_utils import CustomAPITestCase, full_table_scans
 from restaurant.models import Restaurant, Menu
 from restaurant.serializers import RestaurantSerializer, MenuSerializer
+from restaurant.views import MenuViewSet, RestaurantViewSet
 from user.models import SelectorUser
 
 
@@ -143,19 +148,65 @@ class RestaurantViewsTest(CustomAPITestCase):
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.data["name"], self.valid_data["name"])
 
-        response = self.client.get(self.url_restaurant)
+        with self.assertNoFullTableScan():
+            response = self.client.get(self.url_restaurant)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["id"], 1)
+        self.assertEqual(response.data["results"][0]["name"], self.valid_data["name"])
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.admin_token.key}")
+        with self.assertNoFullTableScan(allowed_tables=["restaurant_restaurant"]):
+            response = self.client.get(self.url_restaurant)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.data[0]["id"], 1)
-        self.assertEqual(response.data[0]["name"], self.valid_data["name"])
 
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.manager_token.key}")
         response = self.client.put(
-            f"{self.url_restaurant}{response.data[0]['id']}/",
+            f"{self.url_restaurant}{response.data['results'][0]['id']}/",
             data={"name": "another restaurant"}
         )
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data["name"], "another restaurant")
 
 
+    def test_cursor_pagination(self):
+        for i in range(5):
+            Restaurant.objects.create(name=f"restaurant {i}", manager=self.manager_instance)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.admin_token.key}")
+
+        ids, url = [], f"{self.url_restaurant}?page_size=2"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data["results"]), 2)
+            ids.extend(restaurant["id"] for restaurant in response.data["results"])
+            if len(ids) == 2:
+                Restaurant.objects.create(name="new restaurant", manager=self.manager_instance)
+            url = response.data["next"]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(ids), 5)
+
+
+    def test_export_restaurants(self):
+        Restaurant.objects.create(name="restaurant, with comma", manager=self.manager_instance)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.manager_token.key}")
+        response = self.client.get(f"{self.url_restaurant}export/")
+        self.assertEqual(response.status_code, 403)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.employee_token.key}")
+        response = self.client.get(reverse("menu-export"))
+        self.assertEqual(response.status_code, 403)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.admin_token.key}")
+        response = self.client.get(
+            f"{self.url_restaurant}export/", data={"file_format": "csv"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            b"".join(response.streaming_content).decode().splitlines(),
+            ["id,name,manager", f'1,"restaurant, with comma",{self.manager_instance.id}']
+        )
+
+
 class MenuModelTest(TestCase):
 
     def setUp(self):
@@ -202,6 +253,21 @@ class MenuModelTest(TestCase):
         )
 
 
+class MenuQueryPlanTest(TestCase):
+
+    def test_full_table_scans(self):
+        self.assertEqual(
+            full_table_scans('SELECT * FROM "restaurant_menu"'), ["restaurant_menu"]
+        )
+        self.assertEqual(
+            full_table_scans(
+                'SELECT "id" FROM "restaurant_menu" WHERE "day" = \'2021-07-22\' '
+                'ORDER BY "vote_count" DESC'
+            ),
+            []
+        )
+
+
 class MenuSerializerTest(TestCase):
 
     def setUp(self):
@@ -270,6 +336,53 @@ class MenuViewsTest(CustomAPITestCase):
             "details": "Corn Soup\nMixed vegetables Sandwich\nRoasted Vegetables"
         }
 
+    def test_idempotency_key(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.manager_token.key}")
+        retries = []
+        perform_create = MenuViewSet.perform_create
+
+        def retry_while_running(view, serializer):
+            retries.append(self.client.post(
+                self.url_menu, data=self.valid_data, HTTP_IDEMPOTENCY_KEY="menu-1"
+            ))
+            perform_create(view, serializer)
+
+        with mock.patch.object(MenuViewSet, "perform_create", retry_while_running):
+            response = self.client.post(
+                self.url_menu, data=self.valid_data, HTTP_IDEMPOTENCY_KEY="menu-1"
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(retries[0].status_code, 409)
+
+        with self.assertNumQueries(0):
+            replay = self.client.post(
+                self.url_menu, data=self.valid_data, HTTP_IDEMPOTENCY_KEY="menu-1"
+            )
+        self.assertEqual(replay.data, response.data)
+        self.assertEqual(Menu.objects.count(), 1)
+
+        url = f"{self.url_menu}{response.data['id']}/"
+        data = {**self.valid_data, "name": "another menu"}
+        response = self.client.put(url, data=data, HTTP_IDEMPOTENCY_KEY="menu-2")
+        self.assertEqual(response.status_code, 200)
+        Menu.objects.filter(pk=response.data["id"]).update(name="changed")
+        replay = self.client.put(url, data=data, HTTP_IDEMPOTENCY_KEY="menu-2")
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(Menu.objects.get(pk=response.data["id"]).name, "changed")
+
+    def test_idempotency_key_after_server_error(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.manager_token.key}")
+        with mock.patch.object(MenuViewSet, "perform_create", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(
+                    self.url_menu, data=self.valid_data, HTTP_IDEMPOTENCY_KEY="menu-1"
+                )
+        response = self.client.post(
+            self.url_menu, data=self.valid_data, HTTP_IDEMPOTENCY_KEY="menu-1"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", response)
+
     def test_menu_url_without_token(self):
         response = self.client.get(self.url_menu)
         self.assertEqual(response.status_code, 401)
@@ -291,7 +404,8 @@ class MenuViewsTest(CustomAPITestCase):
 
     def test_crud_menu(self):
         self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.employee_token.key}")
-        response = self.client.get(self.url_menu)
+        with self.assertNoFullTableScan():
+            response = self.client.get(self.url_menu)
         self.assertEqual(response.status_code, 200)
 
         self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.manager_token.key}")
@@ -301,11 +415,15 @@ class MenuViewsTest(CustomAPITestCase):
 
         response = self.client.get(self.url_menu)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.data[0]["id"], 1)
-        self.assertEqual(response.data[0]["name"], self.valid_data["name"])
+        self.assertEqual(response.data["results"][0]["id"], 1)
+        self.assertEqual(response.data["results"][0]["name"], self.valid_data["name"])
+
+        with self.assertNoFullTableScan():
+            response = self.client.get(self.url_menu)
+        self.assertEqual(response.status_code, 200)
 
         response = self.client.put(
-            f"{self.url_menu}{response.data[0]['id']}/",
+            f"{self.url_menu}{response.data['results'][0]['id']}/",
             data={
                 "restaurant": self.restaurant.id,
                 "name": "another menu",
@@ -314,3 +432,324 @@ class MenuViewsTest(CustomAPITestCase):
         )
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data["name"], "another menu")
+
+
+class MenuSearchTest(CustomAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url_search = reverse("menu-search")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.admin_token.key}")
+        self.restaurant1 = Restaurant.objects.create(
+            name="restaurant1", manager=self.manager_instance
+        )
+        self.restaurant2 = Restaurant.objects.create(
+            name="restaurant2", manager=self.manager_instance
+        )
+        today = datetime.date.today()
+        self.chicken_menu = Menu.objects.create(
+            restaurant=self.restaurant1, name="Chicken day", day=today,
+            details="Chicken Soup\nRoasted Chicken"
+        )
+        self.salad_menu = Menu.objects.create(
+            restaurant=self.restaurant2, name="Green",
+            day=today - datetime.timedelta(days=400),
+            details="Salad with Chicken\nCorn Soup"
+        )
+        Menu.objects.create(
+            restaurant=self.restaurant1, name="Fish",
+            day=today - datetime.timedelta(days=1),
+            details="Fried fish\nRice"
+        )
+
+    def search(self, **params):
+        response = self.client.get(self.url_search, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_search_ranked(self):
+        data = self.search(q="chicken")
+        self.assertEqual(
+            [menu["id"] for menu in data["results"]],
+            [self.chicken_menu.id, self.salad_menu.id]
+        )
+        self.assertEqual(data["results"][0]["restaurant"], "restaurant1")
+        self.assertEqual(data["results"][1]["day"], self.salad_menu.day)
+        self.assertEqual(
+            [menu["id"] for menu in self.search(q="corn chick")["results"]],
+            [self.salad_menu.id]
+        )
+        self.assertEqual(self.search(q='soup" OR (')["results"], [])
+
+    def test_search_follows_menu_changes(self):
+        self.chicken_menu.details = "Beef stew"
+        self.chicken_menu.name = "Beef day"
+        self.chicken_menu.save()
+        self.salad_menu.vote_count = 3
+        self.salad_menu.save()
+        self.assertEqual(
+            [menu["id"] for menu in self.search(q="chicken")["results"]],
+            [self.salad_menu.id]
+        )
+        self.assertEqual(
+            [menu["id"] for menu in self.search(q="beef")["results"]],
+            [self.chicken_menu.id]
+        )
+        self.salad_menu.delete()
+        self.assertEqual(self.search(q="chicken")["results"], [])
+
+    def test_search_pagination(self):
+        data = self.search(q="soup", page_size=1)
+        self.assertEqual(len(data["results"]), 1)
+        self.assertIsNone(data["previous"])
+        response = self.client.get(data["next"])
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNone(response.data["next"])
+        self.assertIsNotNone(response.data["previous"])
+        self.assertNotEqual(response.data["results"][0]["id"], data["results"][0]["id"])
+
+    def test_search_scoped_like_list(self):
+        manager2 = SelectorUser.objects.create(
+            username="manager2", user_type=SelectorUser.RESTAURANT_MANAGER
+        )
+        self.restaurant2.manager = manager2
+        self.restaurant2.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.manager_token.key}")
+        self.assertEqual(
+            [menu["id"] for menu in self.search(q="chicken")["results"]],
+            [self.chicken_menu.id]
+        )
+        # employees only list today's menus
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.employee_token.key}")
+        self.assertEqual(
+            [menu["id"] for menu in self.search(q="soup")["results"]],
+            [self.chicken_menu.id]
+        )
+
+    def test_invalid_search(self):
+        response = self.client.get(self.url_search)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url_search, {"q": "soup", "page": "0"})
+        self.assertEqual(response.status_code, 400)
+        self.client.credentials()
+        response = self.client.get(self.url_search, {"q": "soup"})
+        self.assertEqual(response.status_code, 401)
+
+
+class MenuFilterTest(CustomAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url_menu = reverse("menu-list")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.admin_token.key}")
+        self.restaurant1 = Restaurant.objects.create(
+            name="restaurant1", manager=self.manager_instance
+        )
+        self.restaurant2 = Restaurant.objects.create(
+            name="restaurant2", manager=self.manager_instance
+        )
+        self.today = datetime.date.today()
+        self.yesterday = self.today - datetime.timedelta(days=1)
+        self.menu1 = Menu.objects.create(
+            restaurant=self.restaurant1, name="Pasta", details="Any", day=self.today,
+            vote_count=1
+        )
+        self.menu2 = Menu.objects.create(
+            restaurant=self.restaurant2, name="Pizza", details="Any", day=self.today,
+            vote_count=5
+        )
+        self.menu3 = Menu.objects.create(
+            restaurant=self.restaurant1, name="Soup", details="Any", day=self.yesterday,
+            vote_count=3
+        )
+
+    def get_ids(self, **params):
+        with self.assertNoFullTableScan():
+            response = self.client.get(self.url_menu, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [menu["id"] for menu in response.data["results"]]
+
+    def test_filters(self):
+        self.assertEqual(
+            self.get_ids(day=self.today), [self.menu2.id, self.menu1.id]
+        )
+        self.assertEqual(
+            self.get_ids(restaurant=self.restaurant1.id, day_from=self.yesterday,
+                         day_to=self.yesterday),
+            [self.menu3.id]
+        )
+        self.assertEqual(
+            self.get_ids(manager=self.manager_instance.id, day=self.today),
+            [self.menu2.id, self.menu1.id]
+        )
+        self.assertEqual(self.get_ids(name="P"), [self.menu2.id, self.menu1.id])
+        self.assertEqual(self.get_ids(name="Pi"), [self.menu2.id])
+        self.assertEqual(self.get_ids(name="pi"), [])
+        self.assertEqual(self.get_ids(restaurant=self.restaurant2.id), [self.menu2.id])
+
+    def test_ordering(self):
+        self.assertEqual(
+            self.get_ids(day=self.today, ordering="vote_count"),
+            [self.menu1.id, self.menu2.id]
+        )
+        self.assertEqual(
+            self.get_ids(day=self.today, ordering="-vote_count"),
+            [self.menu2.id, self.menu1.id]
+        )
+        self.assertEqual(
+            self.get_ids(restaurant=self.restaurant1.id, ordering="day"),
+            [self.menu3.id, self.menu1.id]
+        )
+        self.assertEqual(
+            self.get_ids(ordering="-day"), [self.menu2.id, self.menu1.id, self.menu3.id]
+        )
+
+    def test_vote_count_ordering_paged_by_offset(self):
+        menu4 = Menu.objects.create(
+            restaurant=Restaurant.objects.create(
+                name="restaurant3", manager=self.manager_instance
+            ),
+            name="Rice", details="Any", day=self.today, vote_count=5
+        )
+        params = {"day": self.today, "ordering": "-vote_count", "page_size": 2}
+        response = self.client.get(self.url_menu, params)
+        self.assertEqual(
+            [menu["id"] for menu in response.data["results"]], [menu4.id, self.menu2.id]
+        )
+        self.assertIsNone(response.data["previous"])
+        self.assertIn("page=2", response.data["next"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual([menu["id"] for menu in response.data["results"]], [self.menu1.id])
+        self.assertIsNone(response.data["next"])
+        self.assertIn("page=1", response.data["previous"])
+        response = self.client.get(self.url_menu, {**params, "page": "0"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_name_prefix_case_sensitive(self):
+        self.assertEqual(self.get_ids(name="Pa"), [self.menu1.id])
+        self.assertEqual(self.get_ids(name="pa"), [])
+        response = self.client.get(reverse("restaurant-list"), {"name": "Rest"})
+        self.assertEqual(response.data["results"], [])
+
+    def test_unindexed_combinations(self):
+        for params in [
+                {"ordering": "vote_count"},
+                {"day_from": self.yesterday, "ordering": "vote_count"},
+                {"name": "P", "day": self.today},
+                {"name": "P", "day_from": self.yesterday},
+                {"ordering": "name"},
+                {"day": "today"},
+                {"restaurant": "first"},
+        ]:
+            response = self.client.get(self.url_menu, params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_restaurant_filters(self):
+        url_restaurant = reverse("restaurant-list")
+        other_manager = SelectorUser.objects.create(
+            username="other_manager", user_type=SelectorUser.RESTAURANT_MANAGER
+        )
+        other = Restaurant.objects.create(name="other", manager=other_manager)
+        with self.assertNoFullTableScan():
+            response = self.client.get(url_restaurant, {"manager": other_manager.id})
+        self.assertEqual(
+            [restaurant["id"] for restaurant in response.data["results"]], [other.id]
+        )
+        with self.assertNoFullTableScan():
+            response = self.client.get(
+                url_restaurant, {"name": "rest", "ordering": "-name"}
+            )
+        self.assertEqual(
+            [restaurant["id"] for restaurant in response.data["results"]],
+            [self.restaurant2.id, self.restaurant1.id]
+        )
+        response = self.client.get(
+            url_restaurant, {"manager": other_manager.id, "ordering": "name"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class FastReadTest(CustomAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.admin_token.key}")
+        today = datetime.date.today()
+        for i in range(3):
+            restaurant = Restaurant.objects.create(
+                name=f"restaurant{i}", manager=self.manager_instance
+            )
+            for days in range(2):
+                Menu.objects.create(
+                    restaurant=restaurant, name=f"menu {i}", details="Soup\nSalad",
+                    day=today - datetime.timedelta(days=days), vote_count=i
+                )
+
+    def assertSameContent(self, viewset, url, params=None):  # pylint: disable=invalid-name
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        with mock.patch.object(viewset, "fast_read", False):
+            expected = self.client.get(url, params)
+        self.assertEqual(response.content, expected.content)
+        return response
+
+    def test_same_content(self):
+        url_menu = reverse("menu-list")
+        response = self.assertSameContent(MenuViewSet, url_menu, {"page_size": 4})
+        self.assertSameContent(MenuViewSet, response.data["next"])
+        self.assertSameContent(
+            MenuViewSet, url_menu,
+            {"day": datetime.date.today(), "ordering": "-vote_count"}
+        )
+        self.assertSameContent(
+            MenuViewSet, url_menu, {"ordering": "day", "page_size": 2}
+        )
+        self.assertSameContent(
+            MenuViewSet, f"{url_menu}{response.data['results'][0]['id']}/"
+        )
+        self.assertSameContent(RestaurantViewSet, reverse("restaurant-list"))
+        response = self.client.get(f"{url_menu}0/")
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(f"{url_menu}abc/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_sparse_fields(self):
+        url_menu = reverse("menu-list")
+        params = {"fields": "id,day", "page_size": 2}
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url_menu, params)
+        self.assertFalse(any("details" in query["sql"] for query in queries))
+        response = self.assertSameContent(MenuViewSet, url_menu, params)
+        self.assertEqual(list(response.data["results"][0]), ["id", "day"])
+        response = self.assertSameContent(MenuViewSet, response.data["next"])
+        self.assertEqual(list(response.data["results"][0]), ["id", "day"])
+        response = self.assertSameContent(
+            MenuViewSet, f"{url_menu}{response.data['results'][0]['id']}/",
+            {"fields": "name"}
+        )
+        self.assertEqual(list(response.data), ["name"])
+        response = self.assertSameContent(
+            RestaurantViewSet, reverse("restaurant-list"), {"fields": " name, "}
+        )
+        self.assertEqual(list(response.data["results"][0]), ["name"])
+
+        for fields in ("", "id,price", "restaurant"):
+            response = self.client.get(url_menu, {"fields": fields})
+            self.assertEqual(response.status_code, 400, fields)
+            with mock.patch.object(MenuViewSet, "fast_read", False):
+                response = self.client.get(url_menu, {"fields": fields})
+            self.assertEqual(response.status_code, 400, fields)
+
+    def test_unsupported_serializer(self):
+        self.assertEqual(
+            [name for name, _, _ in read_accessors(MenuSerializer())],
+            ["id", "name", "details", "day"]
+        )
+
+        class NamedMenuSerializer(MenuSerializer):
+            restaurant_name = serializers.CharField(source="restaurant.name")
+
+            class Meta(MenuSerializer.Meta):  # pylint: disable=missing-class-docstring
+                fields = MenuSerializer.Meta.fields + ("restaurant_name",)
+
+        self.assertIsNone(read_accessors(NamedMenuSerializer()))
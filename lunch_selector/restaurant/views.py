@@ -3,17 +3,38 @@ import datetime
 import logging
 
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
+from restaurant import search
 from restaurant.serializers import RestaurantSerializer, MenuSerializer
 from user.models import SelectorUser
+from lunch_selector import filters
+from lunch_selector.export import ExportMixin, parse_day
+from lunch_selector.fast_read import FastReadMixin
+from lunch_selector.idempotency import IdempotencyMixin
 
 logger = logging.getLogger(__name__)
 
 
-class RestaurantViewSet(viewsets.ModelViewSet):
+class RestaurantViewSet(FastReadMixin, ExportMixin, viewsets.ModelViewSet):
     """Restaurant create, update, delete DRF views"""
     serializer_class = RestaurantSerializer
+    export_fields = ("id", "name", "manager")
+    filter_backends = [filters.IndexedFilterBackend]
+    filter_params = {
+        "manager": ("manager", filters.EQUAL, "manager", filters.integer),
+        "name": ("name", filters.RANGE, ("name__gte", "name__lt"), filters.text),
+    }
+    ordering_fields = ("name",)
+    # columns of Restaurant indexes
+    filter_indexes = (("manager",), ("name",))
+
+    def filter_export_queryset(self, queryset):
+        """Restaurants have no day"""
+        return queryset
 
     def get_queryset(self):
         """get restaurants based on user type"""
@@ -33,9 +54,27 @@ class RestaurantViewSet(viewsets.ModelViewSet):
         super().initial(request, *args, **kwargs)
 
 
-class MenuViewSet(viewsets.ModelViewSet):
+class MenuViewSet(IdempotencyMixin, FastReadMixin, ExportMixin, viewsets.ModelViewSet):
     """Menu create, update, delete DRF views"""
     serializer_class = MenuSerializer
+    export_fields = ("id", "restaurant", "name", "details", "day", "vote_count")
+    filter_backends = [filters.IndexedFilterBackend]
+    filter_params = {
+        "day": ("day", filters.EQUAL, "day", parse_day),
+        "day_from": ("day", filters.RANGE, "day__gte", parse_day),
+        "day_to": ("day", filters.RANGE, "day__lte", parse_day),
+        "restaurant": ("restaurant", filters.EQUAL, "restaurant", filters.integer),
+        # joined through the manager index of restaurants to the menu's restaurant column
+        "manager": ("restaurant", filters.EQUAL, "restaurant__manager", filters.integer),
+        "name": ("name", filters.RANGE, ("name__gte", "name__lt"), filters.text),
+    }
+    ordering_fields = ("vote_count", "day")
+    # votes change vote_count while clients page, a cursor would skip or repeat menus
+    offset_ordering_fields = ("vote_count",)
+    # columns of Menu indexes
+    filter_indexes = (("restaurant", "day"), ("day", "vote_count"), ("name",))
+    search_page_size = 20
+    search_max_page_size = 100
 
     def get_queryset(self):
         """Get menus by user type"""
@@ -63,3 +102,35 @@ class MenuViewSet(viewsets.ModelViewSet):
                 )
 
         return super().create(request, *args, **kwargs)
+
+    def _positive_int_param(self, name, default, maximum=None):
+        """Positive integer query parameter"""
+        value = self.request.query_params.get(name, default)
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            value = 0
+        if value < 1:
+            raise ValidationError({name: "Must be a positive integer."})
+        return min(value, maximum) if maximum else value
+
+    @action(detail=False)
+    def search(self, request):
+        """Menus the user may list matching ?q=, best matches first"""
+        query = request.query_params.get("q", "")
+        if not query.strip():
+            raise ValidationError({"q": "This parameter is required."})
+        page = self._positive_int_param("page", 1)
+        page_size = self._positive_int_param(
+            "page_size", self.search_page_size, self.search_max_page_size
+        )
+        results = search.search_menus(
+            query, page_size + 1, (page - 1) * page_size, self.get_queryset()
+        )
+        url = request.build_absolute_uri()
+        return Response({
+            "next": replace_query_param(url, "page", page + 1)
+            if len(results) > page_size else None,
+            "previous": replace_query_param(url, "page", page - 1) if page > 1 else None,
+            "results": results[:page_size],
+        })
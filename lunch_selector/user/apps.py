@@ -6,3 +6,8 @@ class UserConfig(AppConfig):
     """user app config"""
     default_auto_field = "django.db.models.BigAutoField"
     name = "user"
+
+    def ready(self):
+        """Connect signal receivers"""
+        # pylint: disable=import-outside-toplevel,unused-import
+        from user import signals
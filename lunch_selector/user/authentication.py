@@ -0,0 +1,59 @@
+"""DRF authentication with cached and expiring tokens"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+
+def token_cache_key(key):
+    """Cache key of token to user resolution"""
+    return f"auth-token-{key}"
+
+
+def token_expires_at(token):
+    """Expiry time of token, None if tokens never expire"""
+    lifetime = settings.TOKEN_AUTH["LIFETIME"]
+    if lifetime is None:
+        return None
+    return token.created + datetime.timedelta(seconds=lifetime)
+
+
+def token_expired(token):
+    """Check token lifetime"""
+    expires_at = token_expires_at(token)
+    return expires_at is not None and expires_at <= timezone.now()
+
+
+def invalidate_token(key):
+    """Forget cached resolution of a deleted token, for all workers with a shared cache"""
+    cache.delete(token_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication which caches token and user for a bounded time
+
+    A cached user is at most TOKEN_AUTH["CACHE_TIMEOUT"] seconds old and
+    never outlives its token.
+    """
+
+    def authenticate_credentials(self, key):
+        """Resolve token from cache, fall back to database"""
+        cache_key = token_cache_key(key)
+        credentials = cache.get(cache_key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            timeout = settings.TOKEN_AUTH["CACHE_TIMEOUT"]
+            expires_at = token_expires_at(credentials[1])
+            if expires_at is not None:
+                timeout = min(timeout, (expires_at - timezone.now()).total_seconds())
+            if timeout > 0:
+                cache.set(cache_key, credentials, timeout=timeout)
+
+        if token_expired(credentials[1]):
+            invalidate_token(key)
+            raise AuthenticationFailed(_("Token has expired."))
+        return credentials
@@ -0,0 +1,92 @@
+"""Authentication backends"""
+import random
+import threading
+import time
+from types import MappingProxyType
+
+from django.conf import settings
+from django.contrib.auth.backends import BaseBackend
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+
+from user.models import SelectorUser
+
+VERSION_KEY = "user-type-permissions-version"
+
+_permissions = (None, 0.0, MappingProxyType({}))  # pylint: disable=invalid-name
+_lock = threading.Lock()
+
+
+def _current_version():
+    """Shared version, a random start makes maps loaded before a cache flush stale"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, random.getrandbits(48), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate_permissions():
+    """Reload permission map in every worker on next check"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        pass
+
+
+def load_permissions():
+    """Immutable map of user_type to permissions of its group"""
+    user_types = [user_type for user_type, _ in SelectorUser.USER_TYPES]
+    permissions = {user_type: set() for user_type in user_types}
+    rows = Group.objects.filter(
+        name__in=user_types, permissions__isnull=False
+    ).values_list("name", "permissions__content_type__app_label", "permissions__codename")
+    for name, app_label, codename in rows:
+        permissions[name].add(f"{app_label}.{codename}")
+    return MappingProxyType({
+        user_type: frozenset(perms) for user_type, perms in permissions.items()
+    })
+
+
+def _is_current(loaded_version, loaded_at, version):
+    """Whether a map loaded at loaded_at with loaded_version can be used"""
+    max_age = settings.USER_PERMISSIONS["MAX_AGE"]
+    return loaded_version == version and time.monotonic() - loaded_at <= max_age
+
+
+def user_type_permissions():
+    """Permission map of the current version, reloaded after MAX_AGE seconds"""
+    global _permissions  # pylint: disable=global-statement,invalid-name
+    version = _current_version()
+    loaded_version, loaded_at, permissions = _permissions
+    if not _is_current(loaded_version, loaded_at, version):
+        with _lock:
+            loaded_version, loaded_at, permissions = _permissions
+            if not _is_current(loaded_version, loaded_at, version):
+                permissions = load_permissions()
+                _permissions = (version, time.monotonic(), permissions)
+    return permissions
+
+
+class UserTypePermissionBackend(BaseBackend):
+    """Group permissions by user_type without per request queries
+
+    Users belong to the group named after their user_type (see create_groups),
+    so all users of a type share the same permissions. A version bump only
+    reaches other workers through a shared cache, with the default per process
+    cache they reload the map after USER_PERMISSIONS["MAX_AGE"] seconds.
+    Permissions this backend does not grant are still checked by ModelBackend,
+    so a denied check costs its two queries for user and group permissions.
+    """
+
+    def get_group_permissions(self, user_obj, obj=None):
+        """Permissions of the group of user_type"""
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return frozenset()
+        return user_type_permissions().get(
+            getattr(user_obj, "user_type", None), frozenset()
+        )
+
+    def has_perm(self, user_obj, perm, obj=None):
+        """Check permission of active user"""
+        return user_obj.is_active and perm in self.get_group_permissions(user_obj, obj)
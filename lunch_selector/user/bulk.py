@@ -0,0 +1,200 @@
+"""Bulk user import from CSV or JSON
+
+Rows are validated one by one, but usernames are checked against the
+database once per batch and groups are resolved once for the whole import.
+Passwords, the slow part, are hashed by a process pool. Its workers are
+started by a fork server, a fork of a web worker would copy the locks held
+by its log, vote writer and result refresh threads. Pools are kept for later
+imports. Users and their group memberships are inserted with bulk inserts.
+A row with errors is reported and skipped, the other rows are still imported.
+"""
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+
+from user.models import SelectorUser
+from user.serializers import UserImportRowSerializer
+
+logger = logging.getLogger(__name__)
+FORMATS = ("csv", "json")
+DUPLICATE_USERNAME = "A user with that username already exists."
+
+
+def file_format_of(name):
+    """Format by file name extension"""
+    extension = name.rsplit(".", 1)[-1].lower()
+    if extension not in FORMATS:
+        raise ValidationError(
+            {"file_format": f"Must be one of {', '.join(FORMATS)}."}
+        )
+    return extension
+
+
+def read_rows(content, file_format):
+    """Row dicts of CSV with a header line or of a JSON list of objects"""
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError as exc:
+        raise ValidationError({"file": "File must be UTF-8 encoded."}) from exc
+    if file_format == "csv":
+        return list(csv.DictReader(io.StringIO(text)))
+    try:
+        rows = json.loads(text)
+    except ValueError as exc:
+        raise ValidationError({"file": f"Invalid JSON: {exc}"}) from exc
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValidationError({"file": "JSON must be a list of objects."})
+    return rows
+
+
+# worker count: pool
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(workers):
+    """Process pool of workers processes, started once"""
+    with _pools_lock:
+        if workers not in _pools:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context(
+                "forkserver" if "forkserver" in methods else "spawn"
+            )
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _pools[workers]
+
+
+def hash_passwords(passwords, workers):
+    """Hashes of passwords, computed by workers processes"""
+    if workers <= 1 or len(passwords) <= 1:
+        return [make_password(password) for password in passwords]
+    chunk_size = max(1, len(passwords) // (workers * 4))
+    return list(_pool(workers).map(make_password, passwords, chunksize=chunk_size))
+
+
+def _batches(items, batch_size):
+    """Consecutive slices of items"""
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+
+class UserImport:
+    """Import of rows, errors maps row numbers (from 1) to field errors"""
+
+    def __init__(self, rows, workers=None, batch_size=None):
+        self.rows = rows
+        self.workers = workers or settings.USER_IMPORT["WORKERS"]
+        self.batch_size = batch_size or settings.USER_IMPORT["BATCH_SIZE"]
+        self.created = 0
+        self.errors = {}
+
+    def _validate(self):
+        """(row number, validated data) of rows without field errors"""
+        groups = dict(Group.objects.filter(
+            name__in=[user_type for user_type, _ in SelectorUser.USER_TYPES]
+        ).values_list("name", "id"))
+        valid = []
+        for number, row in enumerate(self.rows, start=1):
+            serializer = UserImportRowSerializer(data=row)
+            if not serializer.is_valid():
+                self.errors[number] = serializer.errors
+            elif serializer.validated_data["user_type"] not in groups:
+                self.errors[number] = {"user_type": [
+                    f"Group {serializer.validated_data['user_type']} does not exist, "
+                    f"run create_groups."
+                ]}
+            else:
+                valid.append((number, serializer.validated_data))
+        return groups, valid
+
+    def _unique(self, valid):
+        """Rows whose username is neither taken nor used by an earlier row"""
+        seen = set()
+        unique = []
+        for batch in _batches(valid, self.batch_size):
+            taken = set(SelectorUser.objects.filter(
+                username__in=[data["username"] for _, data in batch]
+            ).values_list("username", flat=True))
+            for number, data in batch:
+                if data["username"] in taken or data["username"] in seen:
+                    self.errors[number] = {"username": [DUPLICATE_USERNAME]}
+                else:
+                    seen.add(data["username"])
+                    unique.append((number, data))
+        return unique
+
+    @staticmethod
+    def _insert(users, groups):
+        """Insert users and their group memberships"""
+        membership = SelectorUser.groups.through
+        with transaction.atomic():
+            SelectorUser.objects.bulk_create(users)
+            # sqlite does not return the ids of bulk inserted rows
+            ids = SelectorUser.objects.filter(
+                username__in=[user.username for user in users]
+            ).values_list("username", "id")
+            user_types = {user.username: user.user_type for user in users}
+            membership.objects.bulk_create(
+                membership(selectoruser_id=user_id, group_id=groups[user_types[username]])
+                for username, user_id in ids
+            )
+
+    def _insert_batch(self, numbered_users, groups):
+        """Insert a batch, row by row if a username was taken meanwhile"""
+        try:
+            self._insert([user for _, user in numbered_users], groups)
+            self.created += len(numbered_users)
+        except IntegrityError:
+            for number, user in numbered_users:
+                try:
+                    self._insert([user], groups)
+                    self.created += 1
+                except IntegrityError:
+                    self.errors[number] = {"username": [DUPLICATE_USERNAME]}
+
+    def run(self):
+        """Import the rows, return the report"""
+        groups, valid = self._validate()
+        valid = self._unique(valid)
+        hashes = hash_passwords([data["password"] for _, data in valid], self.workers)
+
+        numbered_users = []
+        for (number, data), password in zip(valid, hashes):
+            numbered_users.append((number, SelectorUser(
+                username=data["username"],
+                email=data.get("email", ""),
+                first_name=data.get("first_name", ""),
+                last_name=data.get("last_name", ""),
+                user_type=data["user_type"],
+                password=password,
+            )))
+        for batch in _batches(numbered_users, self.batch_size):
+            self._insert_batch(batch, groups)
+
+        logger.info("Imported %s users, rejected %s rows", self.created, len(self.errors))
+        return self.report()
+
+    def report(self):
+        """Created count and errors of rejected rows in row order"""
+        return {
+            "created": self.created,
+            "errors": [
+                {"row": number, "errors": errors}
+                for number, errors in sorted(self.errors.items())
+            ],
+        }
+
+
+def import_users(rows, workers=None, batch_size=None):
+    """Create users of rows, return the created count and per row errors"""
+    return UserImport(rows, workers, batch_size).run()
@@ -1,49 +1,107 @@
 """Create group django management commands
 Usage:
 python manage.py create_groups
+
+Reads permissions, groups and group permissions in three queries and writes
+only the difference, so a run without changes writes nothing.
 """
 from django.contrib.auth.models import Group, Permission
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
+from user.backends import invalidate_permissions
 from user.models import SelectorUser
 
+GROUP_PERMISSIONS = {
+    SelectorUser.RESTAURANT_MANAGER: {
+        "add_restaurant",
+        "change_restaurant",
+        "delete_restaurant",
+        "view_restaurant",
+        "add_menu",
+        "change_menu",
+        "delete_menu",
+        "view_menu",
+    },
+    SelectorUser.EMPLOYEE: {
+        "view_menu",
+        "view_menuvote",
+        "add_menuvote",
+        "delete_menuvote",
+        "change_menuvote",
+    }
+}
+
 
 class Command(BaseCommand):
     """create_groups command class"""
     help = "Create or update user groups"
 
+    @staticmethod
+    def desired_permissions():
+        """Permission ids of each group, admin has all permissions"""
+        permissions = Permission.objects.values_list("id", "codename")
+        desired = {SelectorUser.ADMIN: set()}
+        desired.update({name: set() for name in GROUP_PERMISSIONS})
+        for permission_id, codename in permissions:
+            desired[SelectorUser.ADMIN].add(permission_id)
+            for name, codenames in GROUP_PERMISSIONS.items():
+                if codename in codenames:
+                    desired[name].add(permission_id)
+        return desired
+
+    @staticmethod
+    def current_permissions(group_ids):
+        """Group permission row id by (group id, permission id)"""
+        rows = Group.permissions.through.objects.filter(
+            group_id__in=group_ids.values()
+        ).values_list("id", "group_id", "permission_id")
+        return {
+            (group_id, permission_id): row_id for row_id, group_id, permission_id in rows
+        }
+
+    @staticmethod
+    def create_groups(names):
+        """Create groups of names, return their ids"""
+        Group.objects.bulk_create(Group(name=name) for name in names)
+        return dict(Group.objects.filter(name__in=names).values_list("name", "id"))
+
     def handle(self, *args, **options):
         """create_groups command logic here"""
-        groups = {
-            SelectorUser.ADMIN: Permission.objects.values_list("codename", flat=True),
-            SelectorUser.RESTAURANT_MANAGER: {
-                "add_restaurant",
-                "change_restaurant",
-                "delete_restaurant",
-                "view_restaurant",
-                "add_menu",
-                "change_menu",
-                "delete_menu",
-                "view_menu",
-            },
-            SelectorUser.EMPLOYEE: {
-                "view_menu",
-                "view_menuvote",
-                "add_menuvote",
-                "delete_menuvote",
-                "change_menuvote",
-            }
+        desired = self.desired_permissions()
+        group_ids = dict(Group.objects.filter(name__in=desired).values_list("name", "id"))
+        current = self.current_permissions(group_ids)
+        missing_groups = [name for name in desired if name not in group_ids]
+        wanted = {
+            (group_ids[name], permission_id)
+            for name, permission_ids in desired.items() if name in group_ids
+            for permission_id in permission_ids
         }
+        added, removed = wanted - current.keys(), current.keys() - wanted
+        if not missing_groups and not added and not removed:
+            self.stdout.write(self.style.SUCCESS("Groups are up to date"))
+            return
 
-        for name, permissions in groups.items():
-            permissions = Permission.objects.filter(
-                codename__in=permissions
+        with transaction.atomic():
+            if missing_groups:
+                new_ids = self.create_groups(missing_groups)
+                group_ids.update(new_ids)
+                added |= {
+                    (new_ids[name], permission_id)
+                    for name in missing_groups for permission_id in desired[name]
+                }
+            Group.permissions.through.objects.filter(
+                id__in=[current[key] for key in removed]
+            ).delete()
+            Group.permissions.through.objects.bulk_create(
+                Group.permissions.through(group_id=group_id, permission_id=permission_id)
+                for group_id, permission_id in added
             )
-            group, _ = Group.objects.update_or_create(
-                **{"name": name}
-            )
-            group.permissions.add(*permissions)
 
-            self.stdout.write(
-                self.style.SUCCESS(f"Successfully created/updated groups {name}")
-            )
+        changed = {group_id for group_id, _ in added | removed}
+        for name, group_id in group_ids.items():
+            if group_id in changed:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Successfully created/updated groups {name}")
+                )
+        invalidate_permissions()
@@ -0,0 +1,39 @@
+"""Import users django management commands
+Usage:
+python manage.py import_users users.csv --workers 8 --batch-size 500
+
+CSV files need a header line, JSON files a list of objects. Columns are
+username, password, user_type and optionally first_name, last_name, email.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from user.bulk import FORMATS, file_format_of, import_users, read_rows
+
+
+class Command(BaseCommand):
+    """import_users command class"""
+    help = "Create users from a CSV or JSON file, rows with errors are skipped"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--file-format", choices=FORMATS)
+        parser.add_argument("--workers", type=int, help="password hashing processes")
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        """import_users command logic here"""
+        try:
+            file_format = options["file_format"] or file_format_of(options["path"])
+            with open(options["path"], "rb") as file:
+                rows = read_rows(file.read(), file_format)
+        except (OSError, ValidationError) as exc:
+            raise CommandError(exc) from exc
+
+        report = import_users(rows, options["workers"], options["batch_size"])
+        for error in report["errors"]:
+            for field, messages in error["errors"].items():
+                self.stderr.write(f"row {error['row']}: {field}: {' '.join(messages)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']} users, rejected {len(report['errors'])} rows"
+        ))
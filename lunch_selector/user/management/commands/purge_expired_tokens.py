@@ -0,0 +1,41 @@
+"""Purge expired tokens django management commands
+Usage:
+python manage.py purge_expired_tokens --batch-size 1000
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from user.authentication import token_cache_key
+
+
+class Command(BaseCommand):
+    """purge_expired_tokens command class"""
+    help = "Delete expired auth tokens in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """purge_expired_tokens command logic here"""
+        lifetime = settings.TOKEN_AUTH["LIFETIME"]
+        if lifetime is None:
+            self.stdout.write("Tokens never expire, nothing to purge")
+            return
+
+        cutoff = timezone.now() - datetime.timedelta(seconds=lifetime)
+        expired = Token.objects.filter(created__lte=cutoff)
+        total = 0
+        while True:
+            keys = list(expired.values_list("key", flat=True)[:options["batch_size"]])
+            if not keys:
+                break
+            Token.objects.filter(key__in=keys).delete()
+            cache.delete_many([token_cache_key(key) for key in keys])
+            total += len(keys)
+
+        self.stdout.write(self.style.SUCCESS(f"Purged {total} expired tokens"))
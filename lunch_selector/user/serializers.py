@@ -2,6 +2,7 @@
 import logging
 
 from django.contrib.auth import password_validation as validators, get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
 from rest_framework.utils.representation import smart_repr
@@ -60,7 +61,7 @@ class UserSerializer(serializers.ModelSerializer):
         """Create user after validation all"""
         validated_data.pop("confirm_password")
         user = UserModel.objects.create_user(**validated_data)
-        logger.info(f"User created: {user.username}")
+        logger.info("User created: %s", user.username)
         return user
 
     class Meta:  # pylint: disable=missing-class-docstring
@@ -70,3 +71,36 @@ class UserSerializer(serializers.ModelSerializer):
             "id", "username", "first_name", "last_name", "email",
             "password", "confirm_password", "user_type"
         )
+
+
+class UserImportRowSerializer(serializers.ModelSerializer):
+    """One row of a bulk user import, usernames are checked per batch by the import"""
+    password = serializers.CharField(
+        label=_("Password"), max_length=UserSerializer.password_max_len, write_only=True
+    )
+
+    def validate(self, attrs):
+        """Normalize names and validate the password against the user's attributes"""
+        attrs["username"] = UserModel.normalize_username(attrs["username"])
+        attrs["email"] = UserModel.objects.normalize_email(attrs.get("email", ""))
+        user = UserModel(**{name: value for name, value in attrs.items()
+                            if name != "password"})
+        try:
+            validators.validate_password(password=attrs["password"], user=user)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError({"password": exc.messages}) from exc
+        return attrs
+
+    class Meta:  # pylint: disable=missing-class-docstring
+        model = SelectorUser
+        fields = ("username", "first_name", "last_name", "email", "password", "user_type")
+        extra_kwargs = {"username": {"validators": [UserModel.username_validator]}}
+
+
+class UserImportSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """Uploaded file of a bulk user import"""
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(
+        choices=("csv", "json"), required=False,
+        help_text="Defaults to the file name extension"
+    )
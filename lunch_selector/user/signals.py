@@ -0,0 +1,13 @@
+"""Signal receivers of user app"""
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from user.backends import invalidate_permissions
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+@receiver([post_save, post_delete], sender=Group)
+def invalidate_group_permissions(sender, **kwargs):  # pylint: disable=unused-argument
+    """Group permissions changed"""
+    invalidate_permissions()
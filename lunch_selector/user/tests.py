@@ -1,13 +1,25 @@
 """user app test cases"""
 import copy
+import datetime
 import json
+import tempfile
+from io import StringIO
+from unittest import mock
 
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.db import IntegrityError
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
 from rest_framework.exceptions import ValidationError
 
 from lunch_selector.test_utils import CustomAPITestCase
+from .authentication import CachedTokenAuthentication
+from .bulk import import_users
 from .models import SelectorUser
 from .serializers import UserSerializer
 
@@ -141,3 +153,193 @@ class UserViewsTest(CustomAPITestCase):
 
         response = self.client.post(url)
         self.assertEqual(response.status_code, 401)
+
+
+class TokenAuthenticationTest(CustomAPITestCase):
+
+    def expire(self, token):
+        Token.objects.filter(pk=token.pk).update(
+            created=timezone.now() - datetime.timedelta(days=30)
+        )
+
+    def test_cached_token(self):
+        authentication = CachedTokenAuthentication()
+        user, token = authentication.authenticate_credentials(self.admin_token.key)
+        self.assertEqual(user, self.admin_instance)
+        with self.assertNumQueries(0):
+            user, token = authentication.authenticate_credentials(self.admin_token.key)
+        self.assertEqual(token.key, self.admin_token.key)
+
+    def test_expired_token(self):
+        self.expire(self.admin_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.admin_token.key}")
+        response = self.client.post(reverse("user-create"), data={})
+        self.assertEqual(response.status_code, 401)
+        self.assertRegex(json.dumps(response.data), "Token has expired")
+
+    def test_new_token_after_expiry(self):
+        self.admin_instance.set_password("h@rd-p@$$w0rd")
+        self.admin_instance.save()
+        self.expire(self.admin_token)
+        response = self.client.post(
+            reverse("token"), data={"username": "admin", "password": "h@rd-p@$$w0rd"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data["token"], self.admin_token.key)
+
+    def test_purge_expired_tokens(self):
+        self.expire(self.admin_token)
+        self.expire(self.manager_token)
+        call_command("purge_expired_tokens", batch_size=1, stdout=StringIO())
+        self.assertEqual(
+            list(Token.objects.values_list("key", flat=True)), [self.employee_token.key]
+        )
+
+
+class UserTypePermissionBackendTest(CustomAPITestCase):
+
+    def test_no_queries_per_check(self):
+        self.assertTrue(self.employee_instance.has_perm("vote.add_menuvote"))
+        employee = SelectorUser.objects.get(pk=self.employee_instance.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(employee.has_perms(["vote.add_menuvote", "restaurant.view_menu"]))
+
+    def test_group_permission_change(self):
+        self.assertTrue(self.employee_instance.has_perm("vote.add_menuvote"))
+        group = Group.objects.get(name=SelectorUser.EMPLOYEE)
+        group.permissions.remove(Permission.objects.get(codename="add_menuvote"))
+
+        employee = SelectorUser.objects.get(pk=self.employee_instance.pk)
+        self.assertFalse(employee.has_perm("vote.add_menuvote"))
+
+        call_command("create_groups", stdout=StringIO())
+        employee = SelectorUser.objects.get(pk=self.employee_instance.pk)
+        self.assertTrue(employee.has_perm("vote.add_menuvote"))
+
+    def test_reloaded_after_max_age(self):
+        self.assertTrue(self.employee_instance.has_perm("vote.add_menuvote"))
+        group = Group.objects.get(name=SelectorUser.EMPLOYEE)
+        # another worker's change, the version bump does not reach this one
+        with mock.patch("user.signals.invalidate_permissions"):
+            group.permissions.remove(Permission.objects.get(codename="add_menuvote"))
+        employee = SelectorUser.objects.get(pk=self.employee_instance.pk)
+        self.assertTrue(employee.has_perm("vote.add_menuvote"))
+
+        with override_settings(USER_PERMISSIONS={"MAX_AGE": 0}):
+            employee = SelectorUser.objects.get(pk=self.employee_instance.pk)
+            self.assertFalse(employee.has_perm("vote.add_menuvote"))
+
+    def test_user_permissions_still_checked(self):
+        permission = Permission.objects.get(codename="add_restaurant")
+        self.assertFalse(self.employee_instance.has_perm("restaurant.add_restaurant"))
+        self.employee_instance.user_permissions.add(permission)
+        employee = SelectorUser.objects.get(pk=self.employee_instance.pk)
+        self.assertTrue(employee.has_perm("restaurant.add_restaurant"))
+
+
+class CreateGroupsTest(TestCase):
+
+    def test_no_changes(self):
+        out = StringIO()
+        with self.assertNumQueries(3):
+            call_command("create_groups", stdout=out)
+        self.assertIn("Groups are up to date", out.getvalue())
+
+    def test_sync_difference(self):
+        employee = Group.objects.get(name=SelectorUser.EMPLOYEE)
+        manager = Group.objects.get(name=SelectorUser.RESTAURANT_MANAGER)
+        expected = set(employee.permissions.values_list("codename", flat=True))
+        employee.permissions.remove(Permission.objects.get(codename="add_menuvote"))
+        employee.permissions.add(Permission.objects.get(codename="add_restaurant"))
+        Group.objects.filter(name=SelectorUser.ADMIN).delete()
+
+        out = StringIO()
+        call_command("create_groups", stdout=out)
+        self.assertIn("groups employee", out.getvalue())
+        self.assertIn("groups admin", out.getvalue())
+        self.assertNotIn("groups restaurant_manager", out.getvalue())
+        self.assertEqual(
+            set(employee.permissions.values_list("codename", flat=True)), expected
+        )
+        self.assertEqual(manager.permissions.count(), 8)
+        self.assertEqual(
+            Group.objects.get(name=SelectorUser.ADMIN).permissions.count(),
+            Permission.objects.count()
+        )
+
+
+class UserImportTest(CustomAPITestCase):
+    csv_content = (
+        "username,password,user_type,email\n"
+        "alice,h@rd-p@$$w0rd,employee,alice@EXAMPLE.com\n"
+        "bob,short,employee,\n"
+        "carol,h@rd-p@$$w0rd,restaurant_manager,\n"
+        "alice,h@rd-p@$$w0rd,employee,\n"
+        "employee,h@rd-p@$$w0rd,employee,\n"
+        "dave,h@rd-p@$$w0rd,chef,\n"
+    )
+
+    def test_import_rows(self):
+        report = import_users([
+            {"username": "alice", "password": "h@rd-p@$$w0rd", "user_type": "employee"},
+            {"username": "carol", "password": "h@rd-p@$$w0rd", "user_type": "admin"},
+            {"username": "erin", "password": "h@rd-p@$$w0rd", "user_type": "employee"},
+        ], workers=2, batch_size=2)
+        self.assertEqual(report, {"created": 3, "errors": []})
+        alice = SelectorUser.objects.get(username="alice")
+        self.assertTrue(alice.check_password("h@rd-p@$$w0rd"))
+        self.assertEqual(list(alice.groups.values_list("name", flat=True)), ["employee"])
+        self.assertTrue(alice.has_perm("vote.add_menuvote"))
+        carol = SelectorUser.objects.get(username="carol")
+        self.assertEqual(list(carol.groups.values_list("name", flat=True)), ["admin"])
+
+    def test_row_errors_do_not_abort(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as file:
+            file.write(self.csv_content)
+            file.flush()
+            out, err = StringIO(), StringIO()
+            call_command(
+                "import_users", file.name, "--workers", "1", stdout=out, stderr=err
+            )
+        self.assertIn("Created 2 users, rejected 4 rows", out.getvalue())
+        errors = err.getvalue()
+        self.assertIn("row 2: password:", errors)
+        self.assertIn("row 4: username: A user with that username already exists", errors)
+        self.assertIn("row 5: username: A user with that username already exists", errors)
+        self.assertIn("row 6: user_type:", errors)
+        self.assertEqual(
+            SelectorUser.objects.get(username="alice").email, "alice@example.com"
+        )
+        self.assertTrue(SelectorUser.objects.filter(username="carol").exists())
+
+    def test_import_endpoint(self):
+        url = reverse("user-import")
+        upload = SimpleUploadedFile("users.json", json.dumps([
+            {"username": "alice", "password": "h@rd-p@$$w0rd", "user_type": "employee"},
+            {"username": "bob", "user_type": "employee"},
+        ]).encode())
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.employee_token.key}")
+        response = self.client.post(url, {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 403)
+
+        upload.seek(0)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.admin_token.key}")
+        response = self.client.post(url, {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["errors"][0]["row"], 2)
+        self.assertIn("password", response.data["errors"][0]["errors"])
+
+        response = self.client.post(url, {
+            "file": SimpleUploadedFile("users.txt", b"username"),
+        }, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        with override_settings(USER_IMPORT={**settings.USER_IMPORT, "REQUEST_MAX_ROWS": 1}):
+            upload.seek(0)
+            response = self.client.post(url, {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("import_users", response.data["file"][0])
+        response = self.client.post(url, {
+            "file": SimpleUploadedFile("users.txt", b"{"), "file_format": "json",
+        }, format="multipart")
+        self.assertEqual(response.status_code, 400)
@@ -1,12 +1,19 @@
 """User related views"""
 import logging
 
+from django.conf import settings
 from rest_framework import generics, status
+from rest_framework.authtoken.models import Token
+from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from user.authentication import invalidate_token, token_expired
+from user.bulk import file_format_of, import_users, read_rows
 from user.permissions import AdminPermission
-from user.serializers import UserSerializer
+from user.serializers import UserImportSerializer, UserSerializer
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +24,48 @@ class UserCreateView(generics.CreateAPIView):
     permission_classes = [AdminPermission]
 
 
+class UserImportView(generics.GenericAPIView):
+    """Bulk user creation from an uploaded CSV or JSON file"""
+    serializer_class = UserImportSerializer
+    permission_classes = [AdminPermission]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        """Create the valid rows, report the rejected ones"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data["file"]
+        file_format = serializer.validated_data.get("file_format") \
+            or file_format_of(upload.name)
+        rows = read_rows(upload.read(), file_format)
+        # the request waits for every password hash
+        max_rows = settings.USER_IMPORT["REQUEST_MAX_ROWS"]
+        if len(rows) > max_rows:
+            raise ValidationError({"file": [
+                f"At most {max_rows} rows per request, "
+                f"import larger files with the import_users command."
+            ]})
+        report = import_users(rows)
+        return Response(report, status=status.HTTP_200_OK)
+
+
+class ObtainExpiringAuthToken(ObtainAuthToken):
+    """Login with username and password, replaces an expired token"""
+
+    def post(self, request, *args, **kwargs):
+        """Return token of user, create a new one if old one expired"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data["user"]
+        token, _ = Token.objects.get_or_create(user=user)
+        if token_expired(token):
+            key = token.key
+            token.delete()
+            invalidate_token(key)
+            token = Token.objects.create(user=user)
+        return Response({"token": token.key})
+
+
 class FakeLogoutSerializer:
     """Fake serializer for drf swagger view
     So it will not generate this log:
@@ -34,5 +83,7 @@ class UserLogout(generics.CreateAPIView):
 
     def create(self, request, *args, **kwargs):
         """Delete user token to logout"""
-        request.user.auth_token.delete()
+        key = request.auth.key
+        request.auth.delete()
+        invalidate_token(key)
         return Response("You are logged out", status=status.HTTP_200_OK)
@@ -6,3 +6,8 @@ class VoteConfig(AppConfig):
     """Vote app config class"""
     default_auto_field = "django.db.models.BigAutoField"
     name = "vote"
+
+    def ready(self):
+        """Connect signal receivers"""
+        # pylint: disable=import-outside-toplevel,unused-import
+        from vote import signals
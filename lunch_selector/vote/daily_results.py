@@ -0,0 +1,110 @@
+"""Closing days into DailyResult rows and the consecutive winner rule
+
+A day is closed once it is over: its winners are stored as DailyResult rows
+with the number of consecutive days each restaurant has won. A restaurant
+may not win STREAK_LENGTH days running, so it is excluded when yesterday's
+row already has a streak of STREAK_LENGTH - 1. Days are closed by the
+backfill_daily_results command, reading a result never writes: recent days
+not closed yet are computed from their menus.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from restaurant.models import Menu
+from vote.models import DailyResult
+
+ONE_DAY = datetime.timedelta(days=1)
+
+
+def streak_length():
+    """Number of consecutive wins that is not allowed"""
+    return settings.VOTE_RESULT["STREAK_LENGTH"]
+
+
+def day_winners(day, menus, previous_streaks):
+    """Unsaved DailyResult rows of day
+
+    menus are (menu_id, restaurant_id, vote_count) of day and previous_streaks
+    maps restaurant_id to its streak on the day before.
+    """
+    excluded_streak = streak_length() - 1
+    top, winners = -1, []
+    for menu_id, restaurant_id, vote_count in menus:
+        if previous_streaks.get(restaurant_id, 0) >= excluded_streak:
+            continue
+        if vote_count > top:
+            top, winners = vote_count, [(menu_id, restaurant_id)]
+        elif vote_count == top:
+            winners.append((menu_id, restaurant_id))
+    return [
+        DailyResult(
+            day=day, restaurant_id=restaurant_id, menu_id=menu_id, vote_count=top,
+            streak=previous_streaks.get(restaurant_id, 0) + 1
+        )
+        for menu_id, restaurant_id in winners
+    ]
+
+
+def close_day(day):
+    """Store winners of day, its previous day must be closed already"""
+    streaks = dict(DailyResult.objects.filter(day=day - ONE_DAY).values_list(
+        "restaurant_id", "streak"
+    ))
+    menus = Menu.objects.filter(day=day).values_list("id", "restaurant_id", "vote_count")
+    with transaction.atomic():
+        DailyResult.objects.filter(day=day).delete()
+        DailyResult.objects.bulk_create(
+            day_winners(day, menus, streaks), ignore_conflicts=True
+        )
+
+
+def excluded_cache_key(day):
+    """Cache key of the restaurants that may not win on day"""
+    return f"vote-excluded-restaurants-{day.isoformat()}"
+
+
+def streaks_before(day):
+    """Streak per restaurant that won the day before day
+
+    Read from DailyResult when the day before is closed, days not closed yet
+    are computed from their menus without being stored. Only the last
+    STREAK_LENGTH days can affect day, backfill_daily_results stores them.
+    """
+    start = day - streak_length() * ONE_DAY
+    last_closed = DailyResult.objects.filter(
+        day__range=(start, day - ONE_DAY)
+    ).aggregate(Max("day"))["day__max"]
+    streaks = {}
+    if last_closed is not None:
+        streaks = dict(DailyResult.objects.filter(day=last_closed).values_list(
+            "restaurant_id", "streak"
+        ))
+        start = last_closed + ONE_DAY
+    current = start
+    while current < day:
+        menus = Menu.objects.filter(day=current).values_list(
+            "id", "restaurant_id", "vote_count"
+        )
+        streaks = {
+            row.restaurant_id: row.streak for row in day_winners(current, menus, streaks)
+        }
+        current += ONE_DAY
+    return streaks
+
+
+def excluded_restaurants(day):
+    """Restaurants that may not win on day, cached for a day"""
+    cache_key = excluded_cache_key(day)
+    excluded = cache.get(cache_key)
+    if excluded is None:
+        excluded_streak = streak_length() - 1
+        excluded = frozenset(
+            restaurant_id for restaurant_id, streak in streaks_before(day).items()
+            if streak >= excluded_streak
+        )
+        cache.set(cache_key, excluded, timeout=24 * 60 * 60)
+    return excluded
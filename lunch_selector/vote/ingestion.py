@@ -0,0 +1,158 @@
+"""Group commit pipeline for vote writes
+
+SQLite allows a single writer at a time, so at the voting peak request
+threads queue on the database lock. With ``VOTE_INGESTION["GROUP_COMMIT"]``
+enabled, validated votes are handed to one writer thread which commits them
+in batches, one transaction per batch. Each request still waits until its
+own vote is committed, so responses keep the same meaning. A request that
+stops waiting cancels its vote unless the writer already started it, so a
+timed out vote is never stored behind the client's back.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent import futures
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger(__name__)
+
+
+class VoteNotCommitted(APIException):
+    """Vote was cancelled after waiting too long for the writer"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Vote was not stored in time, try again."
+    default_code = "vote_not_committed"
+
+
+class PendingWrite(futures.Future):
+    """A queued write, the future gets its outcome once the batch committed
+
+    cancel() only succeeds while the writer has not started the write.
+    """
+
+    def __init__(self, func):
+        super().__init__()
+        self.func = func
+
+
+class GroupCommitWriter:
+    """Single writer thread that commits queued writes in batches"""
+
+    def __init__(self, batch_size=64, max_wait=0.005):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start writer thread if not running yet"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="vote-group-commit", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, func, timeout=None):
+        """Queue func and wait until the batch containing it is committed
+
+        On timeout the write is cancelled and TimeoutError raised. A write
+        the writer already started is waited for instead.
+        """
+        self.start()
+        pending = PendingWrite(func)
+        self._queue.put(pending)
+        try:
+            return pending.result(timeout)
+        except futures.TimeoutError:
+            if pending.cancel():
+                raise TimeoutError("Vote was not committed in time") from None
+        return pending.result()
+
+    def collect_batch(self):
+        """Block for the first write, gather more until the batch is full or time is up"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def commit_batch(batch):
+        """Run all writes of batch in one transaction
+
+        Every write gets its own savepoint, so a failing vote
+        does not roll back the others in the batch. Cancelled writes are
+        skipped. Outcomes are set after the commit.
+        """
+        # started write: (result, error)
+        outcomes = {}
+        try:
+            with transaction.atomic():
+                for pending in batch:
+                    if not pending.set_running_or_notify_cancel():
+                        continue
+                    outcomes[pending] = (None, None)
+                    try:
+                        with transaction.atomic():
+                            outcomes[pending] = (pending.func(), None)
+                    except Exception as exc:  # pylint: disable=broad-except
+                        outcomes[pending] = (None, exc)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.exception("Vote batch commit failed")
+            outcomes = {
+                pending: (None, error or exc) for pending, (_, error) in outcomes.items()
+            }
+        finally:
+            for pending, (result, error) in outcomes.items():
+                if error is None:
+                    pending.set_result(result)
+                else:
+                    pending.set_exception(error)
+
+    def _run(self):
+        """Writer thread loop"""
+        while True:
+            batch = self.collect_batch()
+            close_old_connections()
+            logger.debug("Committing vote batch of %s", len(batch))
+            self.commit_batch(batch)
+
+
+_writer = None  # pylint: disable=invalid-name
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Process wide writer configured from settings"""
+    global _writer  # pylint: disable=global-statement,invalid-name
+    with _writer_lock:
+        if _writer is None:
+            config = settings.VOTE_INGESTION
+            _writer = GroupCommitWriter(
+                batch_size=config["BATCH_SIZE"], max_wait=config["MAX_WAIT"]
+            )
+        return _writer
+
+
+def save(serializer):
+    """Save serializer directly or through group commit writer"""
+    config = settings.VOTE_INGESTION
+    if not config["GROUP_COMMIT"]:
+        return serializer.save()
+    try:
+        return get_writer().submit(serializer.save, timeout=config["TIMEOUT"])
+    except TimeoutError as exc:
+        raise VoteNotCommitted() from exc
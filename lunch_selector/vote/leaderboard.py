@@ -0,0 +1,257 @@
+"""In-memory leaderboard of today's menu votes
+
+The board keeps today's menus grouped by vote count, so a vote moves a
+menu between two neighbouring buckets and the winners are always the
+highest bucket. Restaurants excluded by the consecutive winner rule are
+read from yesterday's DailyResult rows once when the board is built and
+never enter the buckets.
+
+Every vote change publishes the menu's new vote count in the django cache
+under a number from a shared sequence. The number is taken inside the
+writing transaction, while the database holds the write, so the numbers of
+one menu's changes follow their commit order. The entry is published when
+the transaction commits. Boards apply the entries they have not seen on the
+next read. Counts are absolute, so an entry that a board built from the
+database already contains changes nothing when applied again. An entry still
+missing after PENDING_TIMEOUT seconds was rolled back or evicted from the
+cache, the board is then rebuilt from database. Menu changes and
+reconciliation start a new epoch, which makes every board rebuild.
+Workers must share the cache (memcached, redis, ...) to see each other's
+votes; LEADERBOARD_MAX_AGE bounds staleness when they don't.
+"""
+import datetime
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from restaurant.models import Menu
+from lunch_selector import metrics
+
+SEQUENCE_KEY = "vote-leaderboard-sequence"
+EPOCH_KEY = "vote-leaderboard-epoch"
+ENTRY_TIMEOUT = 10 * 60
+# a numbered entry still missing after PENDING_TIMEOUT seconds belongs to a
+# rolled back transaction or was evicted
+PENDING_TIMEOUT = 30
+# entries a new board re-reads, covering writes in flight while it is built
+IN_FLIGHT_ENTRIES = 256
+# boards further behind than this are rebuilt instead of catching up
+MAX_ENTRIES_BEHIND = 1000
+
+
+class EntryFeed:
+    """Position of a board in the published entries"""
+
+    def __init__(self, sequence=0):
+        self.sequence = sequence
+        # entry number of the last count read per menu
+        self.applied = {}
+        # missing entry numbers and when they were first missed
+        self.pending = {}
+
+    def read(self, sequence):
+        """Entries up to sequence not read yet, in number order
+
+        An older entry of a menu published after a newer one is skipped.
+        Also returns whether an entry stayed missing for PENDING_TIMEOUT.
+        """
+        numbers = sorted(set(self.pending) | set(range(self.sequence + 1, sequence + 1)))
+        entries = cache.get_many([_entry_key(number) for number in numbers])
+        now = time.monotonic()
+        found, lost = [], False
+        for number in numbers:
+            entry = entries.get(_entry_key(number))
+            if entry is None:
+                first_missed = self.pending.setdefault(number, now)
+                lost = lost or now - first_missed > PENDING_TIMEOUT
+                continue
+            self.pending.pop(number, None)
+            menu_id = entry[1]
+            if number > self.applied.get(menu_id, -1):
+                self.applied[menu_id] = number
+                found.append(entry)
+        self.sequence = max(self.sequence, sequence)
+        return found, lost
+
+
+class DayLeaderboard:
+    """Vote counts of one day's menus bucketed by count"""
+
+    def __init__(self, day, sequence=0, epoch=0, excluded=frozenset()):
+        self.day = day
+        self.epoch = epoch
+        self.excluded = excluded
+        self.feed = EntryFeed(sequence)
+        self.built_at = time.monotonic()
+        self.counts = {}
+        self.payloads = {}
+        self.buckets = defaultdict(set)
+        self.top = -1
+        self._winners = None
+
+    def add_menu(self, menu_id, restaurant_id, payload, vote_count=0):
+        """Track a menu, menus of excluded restaurants never win"""
+        if restaurant_id in self.excluded:
+            return
+        self.counts[menu_id] = vote_count
+        self.payloads[menu_id] = payload
+        self.buckets[vote_count].add(menu_id)
+        self.top = max(self.top, vote_count)
+        self._winners = None
+
+    def add_votes(self, menu_id, amount):
+        """Change count of menu by amount"""
+        if menu_id in self.counts:
+            self.set_count(menu_id, self.counts[menu_id] + amount)
+
+    def set_count(self, menu_id, new_count):
+        """Move menu to the bucket of its new count"""
+        if menu_id not in self.counts:
+            return
+        old_count = self.counts[menu_id]
+        if old_count == new_count:
+            return
+        self.counts[menu_id] = new_count
+        self.buckets[old_count].discard(menu_id)
+        self.buckets[new_count].add(menu_id)
+        if not self.buckets[old_count]:
+            del self.buckets[old_count]
+        if new_count > self.top:
+            self.top = new_count
+        elif old_count == self.top and self.top not in self.buckets:
+            self.top = max(self.buckets)
+        self._winners = None
+
+    def winners(self):
+        """Result data of menus with most votes"""
+        if self._winners is None:
+            self._winners = [
+                self.payloads[menu_id]
+                for menu_id in sorted(self.buckets.get(self.top, ()))
+            ]
+        return list(self._winners)
+
+    def catch_up(self, sequence):
+        """Apply published entries up to sequence, False when one was lost"""
+        entries, lost = self.feed.read(sequence)
+        for day, menu_id, vote_count in entries:
+            if day == self.day:
+                self.set_count(menu_id, vote_count)
+        return not lost
+
+    @classmethod
+    def build(cls, day, sequence, epoch, excluded=frozenset()):
+        """Build board of day from database and the entries of writes in flight"""
+        start = max(epoch, sequence - IN_FLIGHT_ENTRIES)
+        board = cls(day, start, epoch, excluded)
+        menus = Menu.objects.filter(day=day).values_list(
+            "id", "restaurant_id", "restaurant__name", "name", "details", "vote_count"
+        )
+        for menu_id, restaurant_id, restaurant_name, name, details, vote_count in menus:
+            payload = {"restaurant": restaurant_name, "name": name, "details": details}
+            board.add_menu(menu_id, restaurant_id, payload, vote_count)
+        board.catch_up(sequence)
+        return board
+
+
+_board = None  # pylint: disable=invalid-name
+_lock = threading.RLock()
+
+
+def _entry_key(number):
+    """Cache key of published entry number"""
+    return f"vote-leaderboard-entry-{number}"
+
+
+def _state():
+    """Current sequence and epoch numbers
+
+    A random start makes boards built before a cache flush outdated.
+    """
+    values = cache.get_many([SEQUENCE_KEY, EPOCH_KEY])
+    if SEQUENCE_KEY not in values:
+        cache.add(SEQUENCE_KEY, random.getrandbits(48), timeout=None)
+        values[SEQUENCE_KEY] = cache.get(SEQUENCE_KEY)
+    if EPOCH_KEY not in values:
+        cache.add(EPOCH_KEY, values[SEQUENCE_KEY], timeout=None)
+        values[EPOCH_KEY] = cache.get(EPOCH_KEY)
+    return values[SEQUENCE_KEY], values[EPOCH_KEY]
+
+
+def _next_number():
+    """Take the next entry number"""
+    try:
+        return cache.incr(SEQUENCE_KEY)
+    except ValueError:
+        _state()
+        return cache.incr(SEQUENCE_KEY)
+
+
+def _needs_rebuild(board, day, sequence, epoch):
+    """Whether board can not catch up with sequence"""
+    if board is None or board.day != day or board.epoch != epoch:
+        return True
+    max_age = settings.VOTE_RESULT["LEADERBOARD_MAX_AGE"]
+    return not 0 <= sequence - board.feed.sequence <= MAX_ENTRIES_BEHIND \
+        or len(board.feed.pending) > MAX_ENTRIES_BEHIND \
+        or time.monotonic() - board.built_at > max_age
+
+
+def get_board(excluded_restaurants):
+    """Today's board, caught up with published counts or rebuilt
+
+    excluded_restaurants(day) returns the restaurants that may not win,
+    it is only called when the board is built.
+    """
+    global _board  # pylint: disable=global-statement,invalid-name
+    today = datetime.date.today()
+    with _lock:
+        sequence, epoch = _state()
+        board = _board
+        if _needs_rebuild(board, today, sequence, epoch) or not board.catch_up(sequence):
+            metrics.increment(
+                "cache_requests_total", cache="vote_leaderboard", result="miss"
+            )
+            board = _board = DayLeaderboard.build(
+                today, sequence, epoch, excluded_restaurants(today)
+            )
+        else:
+            metrics.increment(
+                "cache_requests_total", cache="vote_leaderboard", result="hit"
+            )
+        return board
+
+
+def result(excluded_restaurants):
+    """Winners of today, see get_board"""
+    return get_board(excluded_restaurants).winners()
+
+
+def reset():
+    """Drop board in this and, through a new epoch, every other worker"""
+    global _board  # pylint: disable=global-statement,invalid-name
+    with _lock:
+        cache.set(EPOCH_KEY, _next_number(), timeout=None)
+        _board = None
+
+
+def record_count(day, menu_id, vote_count, using=None):
+    """Publish vote count of menu once the current transaction commits
+
+    Call inside the transaction that changed the count, after the change.
+    """
+    number = _next_number()
+    transaction.on_commit(
+        lambda: cache.set(_entry_key(number), (day, menu_id, vote_count), ENTRY_TIMEOUT),
+        using=using
+    )
+
+
+def invalidate(using=None):
+    """Rebuild leaderboard once the current transaction commits"""
+    transaction.on_commit(reset, using=using)
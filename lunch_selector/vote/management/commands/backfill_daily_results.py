@@ -0,0 +1,75 @@
+"""Backfill daily results django management commands
+Usage:
+python manage.py backfill_daily_results --chunk-days 30
+
+Closes every day from the day after the last closed one, or the first menu,
+(or --start) up to yesterday (or --end), reading menus of --chunk-days days
+per query. Run it daily, results of days not closed yet are computed on
+every result read.
+"""
+import datetime
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from restaurant.models import Menu
+from vote.daily_results import ONE_DAY, day_winners
+from vote.models import DailyResult
+
+
+class Command(BaseCommand):
+    """backfill_daily_results command class"""
+    help = "Store winners of past days in DailyResult"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=datetime.date.fromisoformat)
+        parser.add_argument("--end", type=datetime.date.fromisoformat)
+        parser.add_argument("--chunk-days", type=int, default=30)
+
+    @staticmethod
+    def _first_open_day():
+        """Day after the last closed day, the first menu's day if none is"""
+        last_closed = DailyResult.objects.aggregate(Max("day"))["day__max"]
+        if last_closed is not None:
+            return last_closed + ONE_DAY
+        return Menu.objects.aggregate(Min("day"))["day__min"]
+
+    def handle(self, *args, **options):
+        """backfill_daily_results command logic here"""
+        start = options["start"] or self._first_open_day()
+        end = options["end"] or datetime.date.today() - ONE_DAY
+        if start is None or start > end:
+            self.stdout.write("Nothing to backfill")
+            return
+
+        previous_streaks = dict(DailyResult.objects.filter(
+            day=start - ONE_DAY
+        ).values_list("restaurant_id", "streak"))
+        chunk_start, total = start, 0
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + (options["chunk_days"] - 1) * ONE_DAY, end)
+            menus = Menu.objects.filter(
+                day__range=(chunk_start, chunk_end)
+            ).order_by("day").values_list("day", "id", "restaurant_id", "vote_count")
+            menus_by_day = {
+                day: [menu[1:] for menu in day_menus]
+                for day, day_menus in groupby(menus, key=lambda menu: menu[0])
+            }
+
+            results, day = [], chunk_start
+            while day <= chunk_end:
+                winners = day_winners(day, menus_by_day.get(day, ()), previous_streaks)
+                previous_streaks = {row.restaurant_id: row.streak for row in winners}
+                results.extend(winners)
+                day += ONE_DAY
+
+            with transaction.atomic():
+                DailyResult.objects.filter(day__range=(chunk_start, chunk_end)).delete()
+                DailyResult.objects.bulk_create(results)
+            total += len(results)
+            self.stdout.write(f"Closed {chunk_start} to {chunk_end}")
+            chunk_start = chunk_end + ONE_DAY
+
+        self.stdout.write(self.style.SUCCESS(f"Stored {total} daily results"))
@@ -0,0 +1,95 @@
+"""Vote result engine benchmark django management commands
+Usage:
+python manage.py benchmark_result --restaurants 10000
+
+Creates restaurants with menus for today and the two days before inside a
+transaction, times every result engine on them and rolls everything back.
+"""
+import datetime
+import random
+import time
+import uuid
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from restaurant.models import Restaurant, Menu
+from user.models import SelectorUser
+from vote import daily_results, leaderboard
+from vote.views import MenuVoteViewSet
+
+
+class Command(BaseCommand):
+    """benchmark_result command class"""
+    help = "Compare time and queries of vote result engines"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--restaurants", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--details-length", type=int, default=500)
+
+    @staticmethod
+    def _populate(restaurants, details_length):
+        """Create restaurants with menus of today and two days before"""
+        prefix = f"benchmark-{uuid.uuid4().hex[:8]}"
+        manager = SelectorUser.objects.create(
+            username=prefix, user_type=SelectorUser.RESTAURANT_MANAGER
+        )
+        Restaurant.objects.bulk_create(
+            Restaurant(name=f"{prefix}-{i}", manager=manager) for i in range(restaurants)
+        )
+        restaurant_ids = Restaurant.objects.filter(manager=manager).values_list(
+            "id", flat=True
+        )
+        today = datetime.date.today()
+        details = "x" * details_length
+        for days in range(3):
+            Menu.objects.bulk_create((
+                Menu(
+                    restaurant_id=restaurant_id, name="menu", details=details,
+                    day=today - datetime.timedelta(days=days),
+                    vote_count=random.randint(0, 50)
+                )
+                for restaurant_id in restaurant_ids
+            ), batch_size=1000)
+
+    def _time(self, name, compute, repeat):
+        """Print average time and query count of compute"""
+        elapsed = 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                data = compute()
+                elapsed += time.perf_counter() - start
+        self.stdout.write(
+            f"{name:<18} {elapsed / repeat * 1000:>10.2f} ms "
+            f"queries={len(queries)} winners={len(data)}"
+        )
+
+    def handle(self, *args, **options):
+        """benchmark_result command logic here"""
+        today = datetime.date.today()
+        with transaction.atomic():
+            self._populate(options["restaurants"], options["details_length"])
+            daily_results.excluded_restaurants(today)
+
+            def _leaderboard_build():
+                leaderboard.reset()
+                return _leaderboard()
+
+            def _leaderboard():
+                return leaderboard.result(daily_results.excluded_restaurants)
+
+            engines = (
+                ("python", MenuVoteViewSet._vote_result_data),  # pylint: disable=protected-access
+                ("sql", MenuVoteViewSet._sql_vote_result_data),  # pylint: disable=protected-access
+                ("leaderboard build", _leaderboard_build),
+                ("leaderboard", _leaderboard),
+            )
+            for name, compute in engines:
+                self._time(name, compute, options["repeat"])
+            transaction.set_rollback(True)
+        cache.delete(daily_results.excluded_cache_key(today))
+        leaderboard.reset()
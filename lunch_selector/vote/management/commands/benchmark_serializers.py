@@ -0,0 +1,100 @@
+"""List serialization benchmark django management commands
+Usage:
+python manage.py benchmark_serializers --rows 10000
+
+Creates rows of restaurants, menus and votes inside a transaction, times the
+regular serializers against the fast read path on them and rolls everything
+back.
+"""
+import datetime
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from restaurant.models import Restaurant, Menu
+from restaurant.serializers import RestaurantSerializer, MenuSerializer
+from user.models import SelectorUser
+from vote.models import MenuVote
+from vote.serializers import MenuVoteSerializer
+from lunch_selector.fast_read import FastReadMixin, read_accessors
+
+
+class Command(BaseCommand):
+    """benchmark_serializers command class"""
+    help = "Compare per row cost of regular and fast read serialization"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    @staticmethod
+    def _populate(rows):
+        """Create rows restaurants, menus of today and votes of employees"""
+        prefix = f"benchmark-{uuid.uuid4().hex[:8]}"
+        manager = SelectorUser.objects.create(
+            username=prefix, user_type=SelectorUser.RESTAURANT_MANAGER
+        )
+        Restaurant.objects.bulk_create(
+            (Restaurant(name=f"{prefix}-{i}", manager=manager) for i in range(rows)),
+            batch_size=1000
+        )
+        restaurants = Restaurant.objects.filter(manager=manager)
+        Menu.objects.bulk_create((
+            Menu(restaurant_id=restaurant_id, name="menu", details="Soup\nSalad")
+            for restaurant_id in restaurants.values_list("id", flat=True)
+        ), batch_size=1000)
+        SelectorUser.objects.bulk_create((
+            SelectorUser(username=f"{prefix}-{i}", user_type=SelectorUser.EMPLOYEE)
+            for i in range(rows)
+        ), batch_size=1000)
+        employee_ids = SelectorUser.objects.filter(
+            username__startswith=f"{prefix}-"
+        ).values_list("id", flat=True)
+        menus = Menu.objects.filter(restaurant__manager=manager)
+        menu_ids = menus.values_list("id", flat=True)
+        MenuVote.objects.bulk_create((
+            MenuVote(menu_id=menu_id, employee_id=employee_id, day=datetime.date.today())
+            for menu_id, employee_id in zip(menu_ids, employee_ids)
+        ), batch_size=1000)
+        return (
+            (RestaurantSerializer, restaurants),
+            (MenuSerializer, menus),
+            (MenuVoteSerializer, MenuVote.objects.filter(menu__in=menus)),
+        )
+
+    def _time(self, name, serialize, repeat):
+        """Print per row time of serialize"""
+        elapsed, rows = 0, 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = len(serialize())
+            elapsed += time.perf_counter() - start
+        self.stdout.write(
+            f"{name:<28} {elapsed / repeat * 1000:>10.2f} ms "
+            f"{elapsed / repeat / max(rows, 1) * 1e6:>8.2f} us/row rows={rows}"
+        )
+
+    def _compare(self, serializer_class, queryset, repeat):
+        """Time regular and fast read serialization of queryset"""
+        accessors = read_accessors(serializer_class())
+        columns = [column for _, column, _ in accessors]
+
+        def _regular():
+            return serializer_class(queryset.all(), many=True).data
+
+        def _fast():
+            return FastReadMixin._represent(  # pylint: disable=protected-access
+                accessors, queryset.values(*columns)
+            )
+
+        self._time(f"{serializer_class.__name__} regular", _regular, repeat)
+        self._time(f"{serializer_class.__name__} fast", _fast, repeat)
+
+    def handle(self, *args, **options):
+        """benchmark_serializers command logic here"""
+        with transaction.atomic():
+            for serializer_class, queryset in self._populate(options["rows"]):
+                self._compare(serializer_class, queryset, options["repeat"])
+            transaction.set_rollback(True)
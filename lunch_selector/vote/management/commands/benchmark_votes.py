@@ -0,0 +1,89 @@
+"""Vote write throughput benchmark django management commands
+Usage:
+python manage.py benchmark_votes --votes 1000 --threads 32
+
+Creates temporary users, a restaurant and a menu, writes votes from
+concurrent threads once directly and once through the group commit writer,
+then removes all created rows.
+"""
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from restaurant.models import Restaurant, Menu
+from user.models import SelectorUser
+from vote.ingestion import GroupCommitWriter
+from vote.models import MenuVote
+
+
+class Command(BaseCommand):
+    """benchmark_votes command class"""
+    help = "Compare direct and group commit vote write throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--votes", type=int, default=500)
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--batch-size", type=int, default=64)
+        parser.add_argument("--max-wait", type=float, default=0.005)
+
+    @staticmethod
+    def _run(votes, threads, write):
+        """Write all votes from a thread pool, return elapsed seconds and errors"""
+        def _vote(vote):
+            try:
+                write(vote)
+                return None
+            except Exception as exc:  # pylint: disable=broad-except
+                return exc
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            errors = [exc for exc in executor.map(_vote, votes) if exc is not None]
+        return time.perf_counter() - start, errors
+
+    def _report(self, name, count, elapsed, errors):
+        """Print one benchmark line"""
+        self.stdout.write(
+            f"{name:<14} {count / elapsed:>10.1f} votes/s "
+            f"{elapsed:>8.3f}s errors={len(errors)}"
+        )
+        if errors:
+            self.stdout.write(f"{'':<14} first error: {errors[0]!r}")
+
+    def handle(self, *args, **options):
+        """benchmark_votes command logic here"""
+        prefix = f"benchmark-{uuid.uuid4().hex[:8]}"
+        manager = SelectorUser.objects.create(
+            username=f"{prefix}-manager", user_type=SelectorUser.RESTAURANT_MANAGER
+        )
+        restaurant = Restaurant.objects.create(name=prefix, manager=manager)
+        menu = Menu.objects.create(restaurant=restaurant, name=prefix, details=prefix)
+        employees = SelectorUser.objects.bulk_create(
+            SelectorUser(username=f"{prefix}-{i}", user_type=SelectorUser.EMPLOYEE)
+            for i in range(options["votes"])
+        )
+        employees = list(SelectorUser.objects.filter(
+            username__in=[employee.username for employee in employees]
+        ))
+        writer = GroupCommitWriter(
+            batch_size=options["batch_size"], max_wait=options["max_wait"]
+        )
+        modes = (
+            ("direct", lambda vote: vote.save()),
+            ("group commit", lambda vote: writer.submit(vote.save)),
+        )
+        try:
+            for name, write in modes:
+                votes = [MenuVote(menu=menu, employee=employee) for employee in employees]
+                elapsed, errors = self._run(votes, options["threads"], write)
+                self._report(name, len(votes), elapsed, errors)
+                MenuVote.objects.filter(menu=menu).delete()
+                Menu.objects.filter(pk=menu.pk).update(vote_count=0)
+        finally:
+            restaurant.delete()
+            SelectorUser.objects.filter(username__startswith=prefix).delete()
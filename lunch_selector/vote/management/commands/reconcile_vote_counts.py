@@ -0,0 +1,110 @@
+"""Reconcile menu vote counts django management commands
+Usage:
+python manage.py reconcile_vote_counts --chunk-days 30
+python manage.py reconcile_vote_counts --days 2 --interval 3600
+
+Counts votes of --chunk-days days of menus per grouped query and rewrites
+vote_count only for menus whose count differs. With --interval it keeps
+running and reconciles every that many seconds.
+"""
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from restaurant.models import Menu
+from vote import leaderboard, result_cache
+from vote.models import MenuVote
+
+ONE_DAY = datetime.timedelta(days=1)
+
+
+class Command(BaseCommand):
+    """reconcile_vote_counts command class"""
+    help = "Fix Menu.vote_count from the stored votes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=datetime.date.fromisoformat)
+        parser.add_argument("--end", type=datetime.date.fromisoformat)
+        parser.add_argument(
+            "--days", type=int, help="Only reconcile this many days up to today"
+        )
+        parser.add_argument("--chunk-days", type=int, default=30)
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument("--interval", type=int, help="Repeat every this many seconds")
+
+    @staticmethod
+    def _vote_count_subquery():
+        """Actual number of votes of the outer menu"""
+        votes = MenuVote.objects.filter(menu=OuterRef("pk")).order_by().values("menu")
+        return Coalesce(Subquery(votes.annotate(count=Count("id")).values("count")), 0)
+
+    def _reconcile_chunk(self, start, end, dry_run):
+        """Fix menus of days start to end, return drifted (id, day, stored, actual)"""
+        drifted = list(
+            Menu.objects.filter(day__range=(start, end)).annotate(
+                actual=Count("votes")
+            ).exclude(vote_count=F("actual")).values_list(
+                "id", "day", "vote_count", "actual"
+            )
+        )
+        if drifted and not dry_run:
+            # recount in the UPDATE itself so votes given meanwhile are not lost
+            Menu.objects.filter(id__in=[menu[0] for menu in drifted]).update(
+                vote_count=self._vote_count_subquery()
+            )
+        return drifted
+
+    def _reconcile(self, start, end, options):
+        """Reconcile days start to end chunk by chunk"""
+        total, drift, changed_days = 0, 0, set()
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + (options["chunk_days"] - 1) * ONE_DAY, end)
+            for menu_id, day, stored, actual in self._reconcile_chunk(
+                    chunk_start, chunk_end, options["dry_run"]):
+                total += 1
+                drift += abs(stored - actual)
+                changed_days.add(day)
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"Menu {menu_id} of {day}: {stored} -> {actual}")
+            chunk_start = chunk_end + ONE_DAY
+
+        self.stdout.write(
+            f"{start} to {end}: {total} menus drifted by {drift} votes"
+            + (" (dry run)" if options["dry_run"] else "")
+        )
+        if not changed_days or options["dry_run"]:
+            return
+        today = datetime.date.today()
+        if today in changed_days:
+            leaderboard.invalidate()
+            result_cache.invalidate(today)
+        past_days = sorted(day for day in changed_days if day < today)
+        if past_days:
+            self.stdout.write(self.style.WARNING(
+                "Counts of closed days changed, refresh their results with: "
+                f"manage.py backfill_daily_results --start {past_days[0]}"
+            ))
+
+    def _range(self, options):
+        """Days to reconcile"""
+        end = options["end"] or datetime.date.today()
+        if options["days"]:
+            return end - (options["days"] - 1) * ONE_DAY, end
+        start = options["start"] or Menu.objects.aggregate(Min("day"))["day__min"]
+        return start, end
+
+    def handle(self, *args, **options):
+        """reconcile_vote_counts command logic here"""
+        while True:
+            start, end = self._range(options)
+            if start is None:
+                self.stdout.write("No menus to reconcile")
+            else:
+                self._reconcile(start, end, options)
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
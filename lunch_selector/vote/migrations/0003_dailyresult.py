@@ -0,0 +1,34 @@
+# Generated by Django 3.2.5 on 2026-10-18 07:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0003_menu_vote_count'),
+        ('vote', '0002_alter_menuvote_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='date')),
+                ('vote_count', models.IntegerField(verbose_name='votes')),
+                ('streak', models.PositiveIntegerField(default=1, verbose_name='consecutive wins')),
+                ('menu', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='restaurant.menu', verbose_name='menu')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_results', to='restaurant.restaurant', verbose_name='restaurant')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='dailyresult',
+            index=models.Index(fields=['day', 'streak'], name='vote_dailyr_day_a49fd0_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyresult',
+            unique_together={('day', 'restaurant')},
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.5 on 2026-10-18 07:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vote', '0003_dailyresult'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='menuvote',
+            index=models.Index(fields=['day', 'menu'], name='vote_menuvo_day_12f4cb_idx'),
+        ),
+    ]
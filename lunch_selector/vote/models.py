@@ -1,11 +1,12 @@
 """Voting related models"""
 import datetime
 
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import ugettext_lazy as _
 
-from restaurant.models import Menu
+from restaurant.models import Menu, Restaurant
 from user.models import SelectorUser
+from vote import leaderboard
 
 
 class MenuVote(models.Model):
@@ -13,7 +14,7 @@ class MenuVote(models.Model):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.old_menu = self.menu
+        self.old_menu_id = self.menu_id
 
     menu = models.ForeignKey(
         to=Menu, verbose_name=_("menu"),
@@ -28,20 +29,74 @@ class MenuVote(models.Model):
     def __str__(self):
         return f"{self.menu.name}-{self.day}"
 
+    @staticmethod
+    def _add_votes(menu, amount, using=None):
+        """Change only vote_count column of menu with a database side increment"""
+        Menu.objects.using(using).filter(pk=menu.pk).update(
+            vote_count=models.F("vote_count") + amount
+        )
+        menu.refresh_from_db(using=using, fields=["vote_count"])
+        leaderboard.record_count(menu.day, menu.pk, menu.vote_count, using)
+
+    def _old_menu(self, using=None):
+        """Menu of the vote as loaded from database, fetched only when needed"""
+        if self.menu_id == self.old_menu_id and MenuVote.menu.is_cached(self):
+            return self.menu
+        return Menu.objects.using(using).only("day", "vote_count").get(
+            pk=self.old_menu_id
+        )
+
     def save(self, force_insert=False, force_update=False, using=None,
              update_fields=None):
-        """update vote_count in menu"""
-        if self.pk:
-            if self.old_menu != self.menu:
-                self.old_menu.vote_count = self.old_menu.vote_count - 1
-                self.old_menu.save()
-                self.menu.vote_count = self.menu.vote_count + 1
-                self.menu.save()
-        else:
-            self.menu.vote_count = self.menu.vote_count + 1
-            self.menu.save()
-
-        super().save(force_insert, force_update, using, update_fields)
+        """Save vote and update vote_count of menus in the same transaction"""
+        with transaction.atomic(using=using):
+            if self.pk is None:
+                self._add_votes(self.menu, 1, using)
+            elif self.old_menu_id != self.menu_id:
+                self._add_votes(self._old_menu(using), -1, using)
+                self._add_votes(self.menu, 1, using)
+            super().save(force_insert, force_update, using, update_fields)
+        self.old_menu_id = self.menu_id
+
+    def delete(self, using=None, keep_parents=False):
+        """Delete vote and decrease vote_count of the voted menu
+
+        The count is only decreased when this call deleted the row, so of
+        concurrent deletes of the same vote only one changes it.
+        """
+        with transaction.atomic(using=using):
+            menu = self._old_menu(using)
+            deleted = super().delete(using, keep_parents)
+            if deleted[1].get(self._meta.label, 0):
+                self._add_votes(menu, -1, using)
+            return deleted
 
     class Meta:  # pylint: disable=missing-class-docstring
         unique_together = ("employee", "day")
+        indexes = [models.Index(fields=["day", "menu"])]
+
+
+class DailyResult(models.Model):
+    """Winner of a closed day
+
+    streak counts the consecutive days the restaurant has won up to this day,
+    so the consecutive winner rule only needs yesterday's rows.
+    """
+    day = models.DateField(verbose_name=_("date"))
+    restaurant = models.ForeignKey(
+        to=Restaurant, verbose_name=_("restaurant"),
+        on_delete=models.CASCADE, related_name="daily_results"
+    )
+    menu = models.ForeignKey(
+        to=Menu, verbose_name=_("menu"), null=True,
+        on_delete=models.SET_NULL, related_name="+"
+    )
+    vote_count = models.IntegerField(verbose_name=_("votes"))
+    streak = models.PositiveIntegerField(verbose_name=_("consecutive wins"), default=1)
+
+    def __str__(self):
+        return f"{self.restaurant_id}-{self.day}"
+
+    class Meta:  # pylint: disable=missing-class-docstring
+        unique_together = ("day", "restaurant")
+        indexes = [models.Index(fields=["day", "streak"])]
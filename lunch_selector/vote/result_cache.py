@@ -0,0 +1,122 @@
+"""Day scoped cache of vote result
+
+Keys carry the calendar day, so a new day never serves yesterday's winners.
+A cached entry is fresh for ``CACHE_SOFT_TTL`` seconds and until a vote
+bumps the day's generation. Stale entries are still served while one
+background thread recomputes them. When there is no entry at all, one
+request computes it and the others wait for its value.
+"""
+import datetime
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from lunch_selector import metrics
+
+logger = logging.getLogger(__name__)
+
+WAIT_INTERVAL = 0.05
+
+
+def _keys(day):
+    """Result, generation and lock keys of day"""
+    day = day.isoformat()
+    return (
+        f"vote-result-{day}",
+        f"vote-result-generation-{day}",
+        f"vote-result-lock-{day}",
+    )
+
+
+def invalidate(day=None):
+    """Mark result of day stale after a vote"""
+    _, generation_key, _ = _keys(day or datetime.date.today())
+    try:
+        cache.incr(generation_key)
+    except ValueError:
+        cache.add(generation_key, 1, timeout=settings.VOTE_RESULT["CACHE_TIMEOUT"])
+
+
+def _refresh(day, compute):
+    """Compute and store result of day, caller holds the lock"""
+    config = settings.VOTE_RESULT
+    result_key, generation_key, _ = _keys(day)
+    generation = cache.get(generation_key, 0)
+    data = compute()
+    entry = {
+        "data": data,
+        "generation": generation,
+        "fresh_until": time.time() + config["CACHE_SOFT_TTL"],
+    }
+    cache.set(result_key, entry, timeout=config["CACHE_TIMEOUT"])
+    return data
+
+
+def _spawn(target):
+    """Run target in a daemon thread, closing its database connection at the end"""
+    def _run():
+        try:
+            target()
+        finally:
+            connection.close()
+
+    threading.Thread(target=_run, name="vote-result-refresh", daemon=True).start()
+
+
+def _refresh_in_background(day, compute):
+    """Recompute stale result unless another worker already does"""
+    _, _, lock_key = _keys(day)
+    if not cache.add(lock_key, True, timeout=settings.VOTE_RESULT["CACHE_LOCK_TIMEOUT"]):
+        return
+
+    def _run():
+        try:
+            _refresh(day, compute)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Vote result refresh failed")
+        finally:
+            cache.delete(lock_key)
+
+    _spawn(_run)
+
+
+def _compute_single_flight(day, compute):
+    """Compute missing result once, other requests wait for it"""
+    config = settings.VOTE_RESULT
+    result_key, _, lock_key = _keys(day)
+    if cache.add(lock_key, True, timeout=config["CACHE_LOCK_TIMEOUT"]):
+        try:
+            return _refresh(day, compute)
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + config["CACHE_WAIT"]
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(result_key)
+        if entry is not None:
+            return entry["data"]
+    logger.warning("Timed out waiting for vote result of %s", day)
+    return compute()
+
+
+def get(compute):
+    """Today's vote result from cache, compute() builds it when needed"""
+    day = datetime.date.today()
+    result_key, generation_key, _ = _keys(day)
+    values = cache.get_many([result_key, generation_key])
+    entry = values.get(result_key)
+    if entry is None:
+        metrics.increment("cache_requests_total", cache="vote_result", result="miss")
+        return _compute_single_flight(day, compute)
+    if entry["generation"] != values.get(generation_key, 0) \
+            or entry["fresh_until"] <= time.time():
+        metrics.increment("cache_requests_total", cache="vote_result", result="stale")
+        _refresh_in_background(day, compute)
+    else:
+        metrics.increment("cache_requests_total", cache="vote_result", result="hit")
+    return entry["data"]
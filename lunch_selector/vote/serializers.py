@@ -4,6 +4,7 @@ import logging
 
 from rest_framework import serializers
 
+from restaurant.models import Menu
 from vote.models import MenuVote
 
 logger = logging.getLogger(__name__)
@@ -14,7 +15,7 @@ class MenuVoteSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """Vote to menu"""
-        logger.info(f"Vote given data: {validated_data}")
+        logger.info("Vote given data: %s", validated_data)
         return super().create(validated_data)
 
     def validate_menu(self, value):
@@ -27,4 +28,8 @@ class MenuVoteSerializer(serializers.ModelSerializer):
         model = MenuVote
         fields = ("id", "menu", "day", "employee")
         read_only_fields = ("day",)
-        extra_kwargs = {"employee": {"write_only": True}}
+        extra_kwargs = {
+            "employee": {"write_only": True},
+            # validation and vote counting never read the menu details
+            "menu": {"queryset": Menu.objects.defer("details")},
+        }
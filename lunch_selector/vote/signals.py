@@ -0,0 +1,13 @@
+"""Signal receivers of vote app"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from restaurant.models import Menu, Restaurant
+from vote import leaderboard
+
+
+@receiver([post_save, post_delete], sender=Menu)
+@receiver([post_save, post_delete], sender=Restaurant)
+def invalidate_leaderboard(sender, using, **kwargs):  # pylint: disable=unused-argument
+    """Menus and restaurant names are part of the result"""
+    leaderboard.invalidate(using)
@@ -1,22 +1,35 @@
 import copy
 import datetime
 import json
-
-from django.db import IntegrityError
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from rest_framework.authtoken.models import Token
 from rest_framework.exceptions import ValidationError as DrfValidationError
+from rest_framework.test import APITransactionTestCase
 
 from lunch_selector.test_utils import CustomAPITestCase
 from restaurant.models import Restaurant, Menu
-from vote.models import MenuVote
+from vote import daily_results, ingestion, leaderboard, result_cache
+from vote.ingestion import GroupCommitWriter, PendingWrite
+from vote.leaderboard import DayLeaderboard
+from vote.models import DailyResult, MenuVote
 from user.models import SelectorUser
 from vote.serializers import MenuVoteSerializer
+from vote.views import MenuVoteViewSet
 
 
 class MenuVoteSetup(TestCase):
 
     def setUp(self):
+        cache.clear()
         manager_instance = SelectorUser(
             username="manager",
             user_type=SelectorUser.RESTAURANT_MANAGER
@@ -72,6 +85,529 @@ class MenuVoteModelTest(MenuVoteSetup):
             IntegrityError, "UNIQUE constraint failed: vote_menuvote.employee_id, vote_menuvote.day",
             vote2.save
         )
+        self.menu.refresh_from_db()
+        self.assertEqual(self.menu.vote_count, 1)
+
+    def test_change_vote_menu(self):
+        other_menu = Menu(
+            restaurant=Restaurant.objects.create(
+                name="other restaurant", manager=self.menu.restaurant.manager
+            ),
+            name="other menu",
+            details="Rice\nLentil soup"
+        )
+        other_menu.save()
+        vote = MenuVote(menu=self.menu, employee=self.employee_instance)
+        vote.save()
+
+        vote = MenuVote.objects.get(pk=vote.pk)
+        vote.menu = other_menu
+        vote.save()
+        self.menu.refresh_from_db()
+        other_menu.refresh_from_db()
+        self.assertEqual(self.menu.vote_count, 0)
+        self.assertEqual(other_menu.vote_count, 1)
+
+        vote.save()
+        other_menu.refresh_from_db()
+        self.assertEqual(other_menu.vote_count, 1)
+
+    def test_vote_count_only_column_updated(self):
+        vote = MenuVote(menu=self.menu, employee=self.employee_instance)
+        with CaptureQueriesContext(connection) as queries:
+            vote.save()
+        menu_updates = [
+            query["sql"] for query in queries.captured_queries
+            if query["sql"].startswith('UPDATE "restaurant_menu"')
+        ]
+        self.assertEqual(len(menu_updates), 1)
+        self.assertNotIn("details", menu_updates[0])
+
+    def test_delete_vote(self):
+        vote = MenuVote(menu=self.menu, employee=self.employee_instance)
+        vote.save()
+        MenuVote.objects.get(pk=vote.pk).delete()
+        self.menu.refresh_from_db()
+        self.assertEqual(self.menu.vote_count, 0)
+
+    def test_concurrent_delete_counted_once(self):
+        vote = MenuVote(menu=self.menu, employee=self.employee_instance)
+        vote.save()
+        first, second = MenuVote.objects.get(pk=vote.pk), MenuVote.objects.get(pk=vote.pk)
+        first.delete()
+        self.assertEqual(second.delete()[0], 0)
+        self.menu.refresh_from_db()
+        self.assertEqual(self.menu.vote_count, 0)
+
+
+class GroupCommitWriterTest(MenuVoteSetup):
+
+    def test_collect_batch_size(self):
+        writer = GroupCommitWriter(batch_size=2, max_wait=0)
+        for _ in range(3):
+            writer._queue.put(PendingWrite(lambda: None))
+        self.assertEqual(len(writer.collect_batch()), 1)
+
+        writer.max_wait = 1
+        self.assertEqual(len(writer.collect_batch()), 2)
+
+    def test_commit_batch(self):
+        employee2 = SelectorUser.objects.create(
+            username="employee2", user_type=SelectorUser.EMPLOYEE
+        )
+        batch = [
+            PendingWrite(MenuVote(menu=self.menu, employee=self.employee_instance).save),
+            PendingWrite(MenuVote(menu=self.menu, employee=self.employee_instance).save),
+            PendingWrite(MenuVote(menu=self.menu, employee=employee2).save),
+        ]
+        GroupCommitWriter.commit_batch(batch)
+
+        self.assertTrue(all(pending.done() for pending in batch))
+        self.assertIsNone(batch[0].exception())
+        self.assertIsInstance(batch[1].exception(), IntegrityError)
+        self.assertIsNone(batch[2].exception())
+        self.menu.refresh_from_db()
+        self.assertEqual(self.menu.vote_count, 2)
+        self.assertEqual(MenuVote.objects.count(), 2)
+
+    def test_cancelled_write_skipped(self):
+        vote = MenuVote(menu=self.menu, employee=self.employee_instance)
+        pending = PendingWrite(vote.save)
+        self.assertTrue(pending.cancel())
+        GroupCommitWriter.commit_batch([pending])
+        self.assertTrue(pending.cancelled())
+        self.assertFalse(MenuVote.objects.exists())
+
+        started = PendingWrite(lambda: None)
+        self.assertTrue(started.set_running_or_notify_cancel())
+        self.assertFalse(started.cancel())
+
+
+class GroupCommitViewTest(APITransactionTestCase):
+    """Votes through the writer thread, which needs committed test data"""
+
+    def setUp(self):
+        cache.clear()
+        call_command("create_groups", stdout=StringIO())
+        self.employee = SelectorUser.objects.create_user(
+            username="employee", user_type=SelectorUser.EMPLOYEE
+        )
+        manager = SelectorUser.objects.create_user(
+            username="manager", user_type=SelectorUser.RESTAURANT_MANAGER
+        )
+        self.menu = Menu.objects.create(
+            restaurant=Restaurant.objects.create(name="restaurant", manager=manager),
+            name="menu", details="Soup"
+        )
+        token = Token.objects.create(user=self.employee)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        settings_override = override_settings(VOTE_INGESTION={
+            **settings.VOTE_INGESTION, "GROUP_COMMIT": True, "TIMEOUT": 5
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_vote_committed_by_writer(self):
+        response = self.client.post(reverse("vote-list"), data={"menu": self.menu.id})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["menu"], self.menu.id)
+        self.menu.refresh_from_db()
+        self.assertEqual(self.menu.vote_count, 1)
+
+        response = self.client.post(reverse("vote-list"), data={"menu": self.menu.id})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(MenuVote.objects.count(), 1)
+
+    def test_timed_out_vote_not_stored(self):
+        stalled = GroupCommitWriter()
+        with mock.patch.object(stalled, "start"), \
+                mock.patch.object(ingestion, "get_writer", return_value=stalled), \
+                override_settings(VOTE_INGESTION={
+                    **settings.VOTE_INGESTION, "GROUP_COMMIT": True, "TIMEOUT": 0.01
+                }):
+            response = self.client.post(reverse("vote-list"), data={"menu": self.menu.id})
+        self.assertEqual(response.status_code, 503)
+        stalled.commit_batch(stalled.collect_batch())
+        self.assertFalse(MenuVote.objects.exists())
+
+        response = self.client.post(reverse("vote-list"), data={"menu": self.menu.id})
+        self.assertEqual(response.status_code, 201)
+
+
+class DayLeaderboardTest(TestCase):
+
+    def setUp(self):
+        self.board = DayLeaderboard(datetime.date.today(), 1, excluded=frozenset({3}))
+        for menu_id, restaurant_id in ((1, 1), (2, 2), (3, 3)):
+            self.board.add_menu(menu_id, restaurant_id, {"name": f"menu {menu_id}"})
+
+    def test_all_menus_win_without_votes(self):
+        self.assertEqual(
+            self.board.winners(), [{"name": "menu 1"}, {"name": "menu 2"}]
+        )
+
+    def test_add_votes(self):
+        self.board.add_votes(1, 1)
+        self.assertEqual(self.board.winners(), [{"name": "menu 1"}])
+        self.board.add_votes(2, 1)
+        self.assertEqual(len(self.board.winners()), 2)
+        self.board.add_votes(1, -1)
+        self.assertEqual(self.board.winners(), [{"name": "menu 2"}])
+        self.board.add_votes(2, -1)
+        self.assertEqual(self.board.top, 0)
+        self.assertEqual(len(self.board.winners()), 2)
+
+    def test_excluded_restaurant(self):
+        self.board.add_votes(3, 5)
+        self.assertNotIn({"name": "menu 3"}, self.board.winners())
+
+    def test_catch_up_keeps_newest_count(self):
+        cache.clear()
+        today = datetime.date.today()
+        cache.set(leaderboard._entry_key(3), (today, 1, 2))
+        self.board.catch_up(3)
+        self.assertEqual(self.board.counts[1], 2)
+        self.assertEqual(set(self.board.feed.pending), {2})
+
+        # entry 2 was published late, after the newer entry 3
+        cache.set(leaderboard._entry_key(2), (today, 1, 1))
+        self.board.catch_up(3)
+        self.assertEqual(self.board.counts[1], 2)
+        self.assertEqual(self.board.feed.pending, {})
+
+
+class LeaderboardTest(MenuVoteSetup):
+
+    def setUp(self):
+        super().setUp()
+        self.other_menu = Menu.objects.create(
+            restaurant=Restaurant.objects.create(
+                name="other restaurant", manager=self.menu.restaurant.manager
+            ),
+            name="other menu",
+            details="Rice\nLentil soup"
+        )
+
+    @staticmethod
+    def board():
+        return leaderboard.get_board(daily_results.excluded_restaurants)
+
+    def result(self):
+        return self.board().winners()
+
+    def test_incremental_vote(self):
+        self.assertEqual(len(self.result()), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuVote(menu=self.other_menu, employee=self.employee_instance).save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.result(), [{
+                "restaurant": "other restaurant",
+                "name": "other menu",
+                "details": "Rice\nLentil soup"
+            }])
+
+    def test_rebuild_before_publish_counts_vote_once(self):
+        self.assertEqual(len(self.result()), 2)
+        with self.captureOnCommitCallbacks() as callbacks:
+            MenuVote(menu=self.other_menu, employee=self.employee_instance).save()
+        # another thread rebuilds between the commit and the publish
+        leaderboard._board = None
+        self.assertEqual(self.board().counts[self.other_menu.pk], 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.board().counts[self.other_menu.pk], 1)
+        self.other_menu.refresh_from_db()
+        self.assertEqual(self.other_menu.vote_count, 1)
+
+    def test_published_votes_applied_in_place(self):
+        board = self.board()
+        employee2 = SelectorUser.objects.create(
+            username="employee2", user_type=SelectorUser.EMPLOYEE
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuVote(menu=self.menu, employee=self.employee_instance).save()
+            MenuVote(menu=self.other_menu, employee=employee2).save()
+        with self.assertNumQueries(0):
+            self.assertIs(self.board(), board)
+        self.assertEqual(board.counts, {self.menu.pk: 1, self.other_menu.pk: 1})
+
+    def test_more_entries_than_default_cache_size(self):
+        board = self.board()
+        numbers = []
+        for vote_count in range(1, 401):
+            with self.captureOnCommitCallbacks(execute=True):
+                leaderboard.record_count(
+                    self.other_menu.day, self.other_menu.pk, vote_count
+                )
+            numbers.append(leaderboard._state()[0])
+        self.assertEqual(
+            len(cache.get_many([leaderboard._entry_key(number) for number in numbers])),
+            400
+        )
+        self.assertIs(self.board(), board)
+        self.assertEqual(board.counts[self.other_menu.pk], 400)
+        self.assertEqual(board.feed.pending, {})
+
+    @mock.patch.object(leaderboard, "PENDING_TIMEOUT", -1)
+    def test_evicted_entry_rebuilds(self):
+        board = self.board()
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuVote(menu=self.other_menu, employee=self.employee_instance).save()
+        cache.delete(leaderboard._entry_key(leaderboard._state()[0]))
+        rebuilt = self.board()
+        self.assertIsNot(rebuilt, board)
+        self.assertEqual(rebuilt.counts[self.other_menu.pk], 1)
+
+    def test_rebuild_on_menu_change(self):
+        self.assertEqual(len(self.result()), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_menu.delete()
+        self.assertEqual(len(self.result()), 1)
+
+    def test_excluded_restaurants(self):
+        DailyResult.objects.create(
+            day=datetime.date.today() - datetime.timedelta(days=1),
+            restaurant=self.menu.restaurant, vote_count=1, streak=2
+        )
+        self.assertEqual(self.result()[0]["restaurant"], "other restaurant")
+
+    def test_same_result_as_python_engine(self):
+        MenuVote(menu=self.menu, employee=self.employee_instance).save()
+        with override_settings(VOTE_RESULT={**settings.VOTE_RESULT, "ENGINE": "python"}):
+            python_result = MenuVoteViewSet().result(None).data
+        self.assertEqual(self.result(), python_result)
+
+
+class DailyResultSetup(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        manager = SelectorUser.objects.create(
+            username="manager", user_type=SelectorUser.RESTAURANT_MANAGER
+        )
+        self.restaurant1 = Restaurant.objects.create(name="restaurant1", manager=manager)
+        self.restaurant2 = Restaurant.objects.create(name="restaurant2", manager=manager)
+        self.today = datetime.date.today()
+
+    def add_menus(self, days_ago, votes1, votes2):
+        day = self.today - datetime.timedelta(days=days_ago)
+        for restaurant, votes in ((self.restaurant1, votes1), (self.restaurant2, votes2)):
+            Menu.objects.create(
+                restaurant=restaurant, name="menu", details="details",
+                day=day, vote_count=votes
+            )
+
+
+class DailyResultTest(DailyResultSetup):
+
+    def test_day_winners(self):
+        winners = daily_results.day_winners(
+            self.today, [(1, 1, 3), (2, 2, 3), (3, 3, 5)], {1: 1, 3: 2}
+        )
+        self.assertEqual(
+            [(row.menu_id, row.vote_count, row.streak) for row in winners],
+            [(1, 3, 2), (2, 3, 1)]
+        )
+
+    def test_consecutive_winner_excluded(self):
+        self.add_menus(2, 3, 1)
+        self.add_menus(1, 3, 1)
+        self.assertEqual(
+            daily_results.excluded_restaurants(self.today), {self.restaurant1.id}
+        )
+        self.assertFalse(DailyResult.objects.exists())
+
+    def test_excluded_winner_can_win_again(self):
+        self.add_menus(3, 3, 1)
+        self.add_menus(2, 3, 1)
+        self.add_menus(1, 3, 1)
+        self.assertEqual(daily_results.excluded_restaurants(self.today), set())
+        self.assertEqual(
+            daily_results.streaks_before(self.today), {self.restaurant2.id: 1}
+        )
+
+    def test_closed_days_read_from_results(self):
+        self.add_menus(2, 3, 1)
+        self.add_menus(1, 3, 1)
+        call_command("backfill_daily_results", stdout=StringIO())
+        self.assertEqual(
+            DailyResult.objects.get(day=self.today - datetime.timedelta(days=1)).streak, 2
+        )
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                daily_results.excluded_restaurants(self.today), {self.restaurant1.id}
+            )
+
+    @override_settings(VOTE_RESULT={**settings.VOTE_RESULT, "STREAK_LENGTH": 2})
+    def test_streak_length(self):
+        self.add_menus(1, 1, 3)
+        self.assertEqual(
+            daily_results.excluded_restaurants(self.today), {self.restaurant2.id}
+        )
+
+    def test_backfill_command(self):
+        for days_ago in range(10, 0, -1):
+            self.add_menus(days_ago, 3, 1)
+        call_command("backfill_daily_results", chunk_days=4, stdout=StringIO())
+        winners = DailyResult.objects.order_by("day").values_list("restaurant_id", "streak")
+        self.assertEqual(len(winners), 10)
+        self.assertEqual(
+            list(winners[:4]),
+            [(self.restaurant1.id, 1), (self.restaurant1.id, 2),
+             (self.restaurant2.id, 1), (self.restaurant1.id, 1)]
+        )
+        out = StringIO()
+        call_command("backfill_daily_results", stdout=out)
+        self.assertEqual(out.getvalue(), "Nothing to backfill\n")
+
+
+class SqlResultTest(DailyResultSetup):
+
+    def test_same_result_as_python_engine(self):
+        restaurant3 = Restaurant.objects.create(
+            name="restaurant3", manager=self.restaurant1.manager
+        )
+        self.add_menus(2, 3, 1)
+        self.add_menus(1, 3, 1)
+        self.add_menus(0, 5, 2)
+        Menu.objects.create(restaurant=restaurant3, name="menu3", details="details")
+        python_result = MenuVoteViewSet._vote_result_data()
+        self.assertEqual(len(python_result), 1)
+
+        with self.assertNumQueries(1):
+            sql_result = MenuVoteViewSet._sql_vote_result_data()
+        self.assertEqual(sql_result, python_result)
+
+    def test_ties(self):
+        self.add_menus(0, 2, 2)
+        self.assertEqual(
+            [menu["restaurant"] for menu in MenuVoteViewSet._sql_vote_result_data()],
+            ["restaurant1", "restaurant2"]
+        )
+
+
+class ReconcileVoteCountsTest(MenuVoteSetup):
+
+    def setUp(self):
+        super().setUp()
+        MenuVote(menu=self.menu, employee=self.employee_instance).save()
+        Menu.objects.filter(pk=self.menu.pk).update(vote_count=4)
+        Menu.objects.filter(pk=self.yesterday_menu.pk).update(vote_count=2)
+
+    def test_dry_run(self):
+        out = StringIO()
+        call_command("reconcile_vote_counts", dry_run=True, stdout=out)
+        self.assertIn("2 menus drifted by 5 votes (dry run)", out.getvalue())
+        self.menu.refresh_from_db()
+        self.assertEqual(self.menu.vote_count, 4)
+
+    def test_reconcile(self):
+        out = StringIO()
+        call_command("reconcile_vote_counts", chunk_days=1, stdout=out)
+        self.assertIn("2 menus drifted by 5 votes", out.getvalue())
+        self.assertIn(f"backfill_daily_results --start {self.yesterday_menu.day}", out.getvalue())
+        self.assertEqual(
+            list(Menu.objects.order_by("id").values_list("vote_count", flat=True)), [1, 0]
+        )
+
+        out = StringIO()
+        call_command("reconcile_vote_counts", days=1, stdout=out)
+        self.assertIn("0 menus drifted by 0 votes", out.getvalue())
+
+
+class ResultCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.result_key, _, self.lock_key = result_cache._keys(datetime.date.today())
+
+    def compute(self):
+        self.calls += 1
+        return [self.calls]
+
+    def test_cached_per_day(self):
+        self.assertIn(datetime.date.today().isoformat(), self.result_key)
+        self.assertEqual(result_cache.get(self.compute), [1])
+        self.assertEqual(result_cache.get(self.compute), [1])
+        self.assertEqual(cache.get(self.result_key)["data"], [1])
+
+    @mock.patch("vote.result_cache._spawn", lambda target: target())
+    def test_stale_result_refreshed_in_background(self):
+        result_cache.get(self.compute)
+        result_cache.invalidate()
+        self.assertEqual(result_cache.get(self.compute), [1])
+        self.assertEqual(result_cache.get(self.compute), [2])
+        self.assertIsNone(cache.get(self.lock_key))
+
+    @mock.patch("vote.result_cache._spawn")
+    def test_single_background_refresh(self, spawn):
+        result_cache.get(self.compute)
+        result_cache.invalidate()
+        result_cache.get(self.compute)
+        result_cache.get(self.compute)
+        self.assertEqual(spawn.call_count, 1)
+
+    def test_wait_for_other_request(self):
+        cache.add(self.lock_key, True)
+        with override_settings(VOTE_RESULT={**settings.VOTE_RESULT, "CACHE_WAIT": 0}), \
+                self.assertLogs("vote.result_cache", "WARNING"):
+            self.assertEqual(result_cache.get(self.compute), [1])
+        self.assertIsNone(cache.get(self.result_key))
+
+
+class MenuVoteQueryCountTest(CustomAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url_vote = reverse("vote-list")
+        self.menus = [
+            Menu.objects.create(
+                restaurant=Restaurant.objects.create(
+                    name=f"restaurant {i}", manager=self.manager_instance
+                ),
+                name=f"menu {i}", details="details"
+            )
+            for i in range(2)
+        ]
+        for i in range(10):
+            employee = SelectorUser.objects.create(
+                username=f"employee {i}", user_type=SelectorUser.EMPLOYEE
+            )
+            MenuVote(menu=self.menus[i % 2], employee=employee).save()
+        self.vote = MenuVote(menu=self.menus[0], employee=self.employee_instance)
+        self.vote.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.admin_token.key}")
+        # token and permissions are cached after the first request
+        self.client.get(f"{self.url_vote}{self.vote.id}/")
+
+    def test_loading_votes_does_not_fetch_menus(self):
+        with self.assertNumQueries(1):
+            votes = list(MenuVote.objects.all())
+        self.assertEqual(len(votes), 11)
+
+    def test_list(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url_vote)
+        self.assertEqual(len(response.data["results"]), 11)
+
+    def test_retrieve(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(f"{self.url_vote}{self.vote.id}/")
+        self.assertEqual(response.data["menu"], self.menus[0].id)
+
+    def test_update(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.employee_token.key}")
+        self.client.get(f"{self.url_vote}{self.vote.id}/")
+        # vote, validation of menu, employee and uniqueness, savepoint, old menu,
+        # two counter updates with refresh, vote update and savepoint release
+        with self.assertNumQueries(12):
+            response = self.client.put(
+                f"{self.url_vote}{self.vote.id}/", data={"menu": self.menus[1].id}
+            )
+        self.assertEqual(response.status_code, 200)
+        counts = Menu.objects.order_by("id").values_list("vote_count", flat=True)
+        self.assertEqual(list(counts), [5, 6])
 
 
 class MenuVoteSerializerTest(MenuVoteSetup):
@@ -161,6 +697,69 @@ class MenuVoteViewsTest(CustomAPITestCase):
             "menu": self.menu1.id
         }
 
+    def test_idempotency_key(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.employee_token.key}")
+        response = self.client.post(
+            self.url_vote, data=self.valid_data, HTTP_IDEMPOTENCY_KEY="vote-1"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", response)
+
+        with self.assertNumQueries(0):
+            replay = self.client.post(
+                self.url_vote, data=self.valid_data, HTTP_IDEMPOTENCY_KEY="vote-1"
+            )
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(replay.json(), response.json())
+        self.assertEqual(MenuVote.objects.count(), 1)
+
+        response = self.client.post(
+            self.url_vote, data={"menu": self.menu2.id}, HTTP_IDEMPOTENCY_KEY="vote-1"
+        )
+        self.assertEqual(response.status_code, 422)
+
+        # another employee's key is unrelated
+        employee = SelectorUser.objects.create_user(
+            "employee2", password="h@rd-p@$$w0rd", user_type=SelectorUser.EMPLOYEE
+        )
+        self.client.force_authenticate(employee)
+        response = self.client.post(
+            self.url_vote, data=self.valid_data, HTTP_IDEMPOTENCY_KEY="vote-1"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", response)
+
+    def test_idempotency_key_replayed_after_many_cache_writes(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.employee_token.key}")
+        response = self.client.post(
+            self.url_vote, data=self.valid_data, HTTP_IDEMPOTENCY_KEY="vote-1"
+        )
+        self.assertEqual(response.status_code, 201)
+        # votes, tokens and other clients' keys
+        others = {f"other-{number}": number for number in range(400)}
+        cache.set_many(others)
+        caches["idempotency"].set_many(others)
+        replay = self.client.post(
+            self.url_vote, data=self.valid_data, HTTP_IDEMPOTENCY_KEY="vote-1"
+        )
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+
+    def test_idempotency_key_error_replay(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.employee_token.key}")
+        data = {"menu": self.yesterday_menu.id}
+        response = self.client.post(self.url_vote, data=data, HTTP_IDEMPOTENCY_KEY="k")
+        self.assertEqual(response.status_code, 400)
+        replay = self.client.post(self.url_vote, data=data, HTTP_IDEMPOTENCY_KEY="k")
+        self.assertEqual(replay.status_code, 400)
+        self.assertEqual(replay.json(), response.json())
+
+        response = self.client.post(
+            self.url_vote, data=self.valid_data, HTTP_IDEMPOTENCY_KEY="k" * 256
+        )
+        self.assertEqual(response.status_code, 400)
+
     def test_vote_url_without_token(self):
         response = self.client.get(self.url_vote)
         self.assertEqual(response.status_code, 401)
@@ -220,14 +819,15 @@ class MenuVoteViewsTest(CustomAPITestCase):
         )
 
         # Vote get
-        response = self.client.get(self.url_vote)
+        with self.assertNoFullTableScan():
+            response = self.client.get(self.url_vote)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.data[0]["id"], 1)
-        self.assertEqual(response.data[0]["menu"], self.valid_data["menu"])
+        self.assertEqual(response.data["results"][0]["id"], 1)
+        self.assertEqual(response.data["results"][0]["menu"], self.valid_data["menu"])
 
         # Vote update
         response = self.client.put(
-            f"{self.url_vote}{response.data[0]['id']}/",
+            f"{self.url_vote}{response.data['results'][0]['id']}/",
             data={"menu": self.menu2.id}
         )
         self.assertEqual(response.status_code, 200)
@@ -241,3 +841,92 @@ class MenuVoteViewsTest(CustomAPITestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data[0]["name"], self.menu2.name)
         self.assertEqual(response.data[0]["details"], self.menu2.details)
+
+    def test_result_query_plans(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.employee_token.key}")
+        for engine in ("leaderboard", "sql", "python"):
+            cache.clear()
+            with override_settings(VOTE_RESULT={**settings.VOTE_RESULT, "ENGINE": engine}), \
+                    self.assertNoFullTableScan():
+                response = self.client.get(f"{self.url_vote}result/")
+            self.assertEqual(response.status_code, 200)
+
+    @override_settings(VOTE_RESULT={**settings.VOTE_RESULT, "ENGINE": "python"})
+    def test_cached_result(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.employee_token.key}")
+        response = self.client.get(f"{self.url_vote}result/")
+        self.assertEqual(len(response.data), 2)
+        # token and permissions are cached
+        with self.assertNumQueries(0):
+            response = self.client.get(f"{self.url_vote}result/")
+        self.assertEqual(len(response.data), 2)
+
+    def test_export_votes(self):
+        employee2 = SelectorUser.objects.create_user(
+            username="employee2", user_type=SelectorUser.EMPLOYEE
+        )
+        MenuVote(menu=self.menu1, employee=self.employee_instance).save()
+        MenuVote(menu=self.menu2, employee=employee2).save()
+        MenuVote(
+            menu=self.yesterday_menu, employee=employee2, day=self.yesterday_menu.day
+        ).save()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.employee_token.key}")
+        response = self.client.get(f"{self.url_vote}export/")
+        self.assertEqual(response.status_code, 403)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.admin_token.key}")
+        response = self.client.get(f"{self.url_vote}export/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(
+            rows[0],
+            {
+                "id": 1, "menu": self.menu1.id, "employee": self.employee_instance.id,
+                "day": datetime.date.today().isoformat()
+            }
+        )
+
+        response = self.client.get(
+            f"{self.url_vote}export/",
+            data={"file_format": "csv", "day_from": datetime.date.today().isoformat()}
+        )
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,menu,employee,day")
+        self.assertEqual(len(lines), 3)
+
+        response = self.client.get(f"{self.url_vote}export/", data={"day_to": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_delete_vote(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.employee_token.key}")
+        response = self.client.post(self.url_vote, data=self.valid_data)
+        self.assertEqual(response.status_code, 201)
+        self.menu1.refresh_from_db()
+        self.assertEqual(self.menu1.vote_count, 1)
+
+        response = self.client.delete(f"{self.url_vote}{response.data['id']}/")
+        self.assertEqual(response.status_code, 204)
+        self.menu1.refresh_from_db()
+        self.assertEqual(self.menu1.vote_count, 0)
+
+    def test_fast_read_same_content(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.employee_token.key}")
+        response = self.client.post(self.url_vote, data=self.valid_data)
+        self.assertEqual(response.status_code, 201)
+        for url in (self.url_vote, f"{self.url_vote}{response.data['id']}/"):
+            response = self.client.get(url)
+            with mock.patch.object(MenuVoteViewSet, "fast_read", False):
+                expected = self.client.get(url)
+            self.assertEqual(response.content, expected.content)
+
+    def test_vote_does_not_read_details(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.employee_token.key}")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url_vote, data=self.valid_data)
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(any("details" in query["sql"] for query in queries))
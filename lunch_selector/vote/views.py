@@ -1,55 +1,35 @@
 """Voting related views"""
 import datetime
 
-from django.core.cache import cache
+from django.conf import settings
+from django.db.models import Max, Subquery
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import viewsets
 
 from restaurant.models import Menu
 from user.models import SelectorUser
+from vote import daily_results, ingestion, leaderboard, result_cache
 from vote.serializers import MenuVoteSerializer
+from lunch_selector.export import ExportMixin
+from lunch_selector.fast_read import FastReadMixin
+from lunch_selector.idempotency import IdempotencyMixin
 
 
-class MenuVoteViewSet(viewsets.ModelViewSet):
+class MenuVoteViewSet(IdempotencyMixin, FastReadMixin, ExportMixin,
+                      viewsets.ModelViewSet):
     """Vote create and update by employee"""
     serializer_class = MenuVoteSerializer
-    RESULT_CACHE_KEY = "vote-result-key"
+    export_fields = ("id", "menu", "employee", "day")
 
     @staticmethod
     def _calculate_vote_result():
         """Get menus with max vote today"""
         today = datetime.date.today()
-        yesterday = today - datetime.timedelta(days=1)
-        day_before_yesterday = today - datetime.timedelta(days=2)
-
-        today_menus = []
-        yesterday_max, yesterday_id = -1, set()
-        before_yesterday_max, before_yesterday_id = -1, set()
-
-        menus = Menu.objects.filter(
-            day__in=[today, yesterday, day_before_yesterday]
-        )
-        for menu in menus:
-            if menu.day == today:
-                today_menus.append(menu)
-            elif menu.day == yesterday:
-                if menu.vote_count > yesterday_max:
-                    yesterday_max = menu.vote_count
-                    yesterday_id = {menu.restaurant_id}
-                elif menu.vote_count == yesterday_max:
-                    yesterday_id.add(menu.restaurant_id)
-            else:
-                if menu.vote_count > before_yesterday_max:
-                    before_yesterday_max = menu.vote_count
-                    before_yesterday_id = {menu.restaurant_id}
-                elif menu.vote_count == before_yesterday_max:
-                    before_yesterday_id.add(menu.restaurant_id)
-
-        intersect = yesterday_id.intersection(before_yesterday_id)
+        excluded = daily_results.excluded_restaurants(today)
         today_max, today_max_menus = -1, set()
-        for menu in today_menus:
-            if menu.restaurant_id not in intersect:
+        for menu in Menu.objects.filter(day=today).only("restaurant_id", "vote_count"):
+            if menu.restaurant_id not in excluded:
                 if menu.vote_count > today_max:
                     today_max = menu.vote_count
                     today_max_menus = {menu}
@@ -57,34 +37,79 @@ class MenuVoteViewSet(viewsets.ModelViewSet):
                     today_max_menus.add(menu)
         return today_max_menus
 
+    @classmethod
+    def _vote_result_data(cls):
+        """Response data of today's winner menus, details are only read for them"""
+        winners = Menu.objects.filter(
+            pk__in=[menu.pk for menu in cls._calculate_vote_result()]
+        ).order_by("id")
+        return [
+            {"restaurant": restaurant, "name": name, "details": details}
+            for restaurant, name, details in winners.values_list(
+                "restaurant__name", "name", "details"
+            )
+        ]
+
+    @staticmethod
+    def _sql_vote_result_data():
+        """Response data of today's winner menus in one query
+
+        Today's maximum among eligible menus is a subquery, only the
+        response columns are selected.
+        """
+        today = datetime.date.today()
+        eligible = Menu.objects.filter(day=today).exclude(
+            restaurant_id__in=daily_results.excluded_restaurants(today)
+        )
+        today_max = eligible.order_by().values("day").annotate(
+            today_max=Max("vote_count")
+        ).values("today_max")
+        menus = eligible.filter(vote_count=Subquery(today_max)).order_by("id")
+        return [
+            {"restaurant": restaurant, "name": name, "details": details}
+            for restaurant, name, details in menus.values_list(
+                "restaurant__name", "name", "details"
+            )
+        ]
+
     @action(
         methods=["get"], detail=False,
         url_path="result"
     )
     def result(self, request):  # pylint: disable=unused-argument
         """Vote result get"""
-        data = cache.get(self.RESULT_CACHE_KEY, None)
-        if not data:
-            data = [
-                {
-                    "restaurant": menu.restaurant.name,
-                    "name": menu.name,
-                    "details": menu.details
-                }
-                for menu in self._calculate_vote_result()
-            ]
-            cache.set(self.RESULT_CACHE_KEY, data)
-        return Response(data)
+        engine = settings.VOTE_RESULT["ENGINE"]
+        if engine == "leaderboard":
+            return Response(leaderboard.result(daily_results.excluded_restaurants))
+        if engine == "sql":
+            return Response(result_cache.get(self._sql_vote_result_data))
+        return Response(result_cache.get(self._vote_result_data))
 
     def create(self, request, *args, **kwargs):
-        """Cache delete on vote create"""
-        cache.delete(self.RESULT_CACHE_KEY)
-        return super().create(request, *args, **kwargs)
+        """Mark cached result stale on vote create"""
+        response = super().create(request, *args, **kwargs)
+        result_cache.invalidate()
+        return response
 
     def update(self, request, *args, **kwargs):
-        """Cache delete on vote update"""
-        cache.delete(self.RESULT_CACHE_KEY)
-        return super().update(request, *args, **kwargs)
+        """Mark cached result stale on vote update"""
+        response = super().update(request, *args, **kwargs)
+        result_cache.invalidate()
+        return response
+
+    def destroy(self, request, *args, **kwargs):
+        """Mark cached result stale on vote delete"""
+        response = super().destroy(request, *args, **kwargs)
+        result_cache.invalidate()
+        return response
+
+    def perform_create(self, serializer):
+        """Save vote directly or with group commit"""
+        ingestion.save(serializer)
+
+    def perform_update(self, serializer):
+        """Save vote directly or with group commit"""
+        ingestion.save(serializer)
 
     def get_queryset(self):
         """Get votes based on user"""